@@ -0,0 +1,143 @@
+# benchmarks for the headless comparison core, run with plain python:
+#   python benchmarks/bench_compare.py
+#   python benchmarks/bench_compare.py --algorithm ndiff --only small_hunks
+#   python benchmarks/bench_compare.py --json after.json --baseline before.json
+
+import os
+import sys
+import gc
+import json
+import time
+import random
+import argparse
+import tracemalloc
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+
+from sbs_core import compare
+
+
+def corpus_large_file( rng ):
+	# big file, a handful of scattered edits
+	linesA = [ 'config.entry_%d = "%x"' % ( i, rng.getrandbits( 32 ) ) for i in range( 100000 ) ]
+	linesB = list( linesA )
+	for n in rng.sample( range( len( linesB ) ), 20 ):
+		linesB[n] = linesB[n].replace( '"', "'" )
+	return '\n'.join( linesA ), '\n'.join( linesB )
+
+def corpus_small_hunks( rng ):
+	# every 20th line touched
+	linesA = [ 'def function_%d( arg ): return arg * %d' % ( i, i ) for i in range( 40000 ) ]
+	linesB = []
+	for i, line in enumerate( linesA ):
+		if i % 20 == 0:
+			linesB.append( line.replace( 'arg', 'value' ) )
+		elif i % 20 == 7:
+			continue
+		else:
+			linesB.append( line )
+		if i % 20 == 13:
+			linesB.append( '# inserted %d' % i )
+	return '\n'.join( linesA ), '\n'.join( linesB )
+
+def corpus_replaced_block( rng ):
+	# a large generated section replaced wholesale
+	head = [ 'header %d' % i for i in range( 1000 ) ]
+	tail = [ 'footer %d' % i for i in range( 1000 ) ]
+	blockA = [ 'old generated %x' % rng.getrandbits( 48 ) for i in range( 20000 ) ]
+	blockB = [ 'new generated %x' % rng.getrandbits( 48 ) for i in range( 25000 ) ]
+	return '\n'.join( head + blockA + tail ), '\n'.join( head + blockB + tail )
+
+def corpus_minified( rng ):
+	# a few very long lines with small changes in each
+	def record( n ):
+		return '{' + ','.join( '"k%d":%d' % ( k, rng.randint( 0, 9 ) ) for k in range( n ) ) + '}'
+	linesA = [ record( 5000 ) for i in range( 40 ) ]
+	linesB = []
+	for line in linesA:
+		chars = list( line )
+		for n in rng.sample( range( len( chars ) ), 25 ):
+			if chars[n].isdigit():
+				chars[n] = str( ( int( chars[n] ) + 1 ) % 10 )
+		linesB.append( ''.join( chars ) )
+	return '\n'.join( linesA ), '\n'.join( linesB )
+
+CORPORA = [
+	( 'large_file', corpus_large_file ),
+	( 'small_hunks', corpus_small_hunks ),
+	( 'replaced_block', corpus_replaced_block ),
+	( 'minified', corpus_minified ),
+]
+
+
+def run_case( name, textA, textB, options, repeat ):
+	times = []
+	for n in range( repeat ):
+		gc.collect()
+		start = time.perf_counter()
+		result = compare.compare_texts( textA, textB, options )
+		times.append( time.perf_counter() - start )
+
+	# measure memory separately, tracemalloc slows everything down
+	gc.collect()
+	tracemalloc.start()
+	result = compare.compare_texts( textA, textB, options )
+	peak = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+
+	return {
+		'name': name,
+		'input_bytes': len( textA ) + len( textB ),
+		'seconds': min( times ),
+		'peak_bytes': peak,
+		'rows': len( result.bufferA ),
+		'removed': len( result.highlightA ),
+		'added': len( result.highlightB ),
+		'intraline': len( result.subHighlightA ) + len( result.subHighlightB ),
+	}
+
+
+def main():
+	parser = argparse.ArgumentParser( description='Benchmark the comparison core' )
+	parser.add_argument( '--algorithm', default=None, help='diff_algorithm setting to use' )
+	parser.add_argument( '--no-intraline', action='store_true', help='disable intraline diffing' )
+	parser.add_argument( '--only', action='append', help='only run the named corpus (repeatable)' )
+	parser.add_argument( '--repeat', type=int, default=3, help='timed runs per corpus, best is reported' )
+	parser.add_argument( '--seed', type=int, default=1234 )
+	parser.add_argument( '--json', help='write results to this file' )
+	parser.add_argument( '--baseline', help='results file from an earlier run to compare against' )
+	args = parser.parse_args()
+
+	options = {}
+	if args.algorithm:
+		options['diff_algorithm'] = args.algorithm
+	if args.no_intraline:
+		options['enable_intraline'] = False
+
+	baseline = {}
+	if args.baseline:
+		with open( args.baseline ) as f:
+			for case in json.load( f )['results']:
+				baseline[case['name']] = case
+
+	results = []
+	print( '%-16s %10s %10s %12s %9s %9s' % ( 'corpus', 'input KB', 'seconds', 'peak KB', 'rows', 'vs base' ) )
+	for name, build in CORPORA:
+		if args.only and name not in args.only:
+			continue
+		textA, textB = build( random.Random( args.seed ) )
+		case = run_case( name, textA, textB, options, args.repeat )
+		results.append( case )
+
+		versus = ''
+		if name in baseline:
+			versus = '%+.0f%%' % ( ( case['seconds'] / baseline[name]['seconds'] - 1 ) * 100 )
+		print( '%-16s %10d %10.3f %12d %9d %9s' % ( name, case['input_bytes'] // 1024, case['seconds'], case['peak_bytes'] // 1024, case['rows'], versus ) )
+
+	if args.json:
+		with open( args.json, 'w' ) as f:
+			json.dump( { 'options': compare.read_options( options ), 'results': results }, f, indent=4 )
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,125 @@
+# peak memory of a two-way comparison against the size of its inputs, run with plain python:
+#   python benchmarks/bench_memory.py
+#   python benchmarks/bench_memory.py --lines 50000 --lines 400000 --only scattered_edits
+#   python benchmarks/bench_memory.py --max-ratio 8 --json memory.json
+#
+# each case goes through the same steps as a comparison opened from two views:
+# split the texts into lines, diff them, then stream the padded rows out a piece at a
+# time (into nothing, standing in for the views). the texts themselves are the input
+# and aren't counted, everything allocated on top of them is
+
+import os
+import sys
+import gc
+import json
+import random
+import argparse
+import tracemalloc
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+
+from sbs_core import compare
+
+
+def corpus_scattered_edits( rng, lines ):
+	# one edit in every thousand lines
+	linesA = [ 'config.entry_%d = "%x"' % ( i, rng.getrandbits( 32 ) ) for i in range( lines ) ]
+	linesB = list( linesA )
+	for n in rng.sample( range( lines ), max( 1, lines // 1000 ) ):
+		linesB[n] = linesB[n].replace( '"', "'" )
+	return '\n'.join( linesA ), '\n'.join( linesB )
+
+def corpus_small_hunks( rng, lines ):
+	# every 20th line touched, with lines taken out and put in around it
+	linesA = [ 'def function_%d( arg ): return arg * %d' % ( i, i ) for i in range( lines ) ]
+	linesB = []
+	for i, line in enumerate( linesA ):
+		if i % 20 == 0:
+			linesB.append( line.replace( 'arg', 'value' ) )
+		elif i % 20 == 7:
+			continue
+		else:
+			linesB.append( line )
+		if i % 20 == 13:
+			linesB.append( '# inserted %d' % i )
+	return '\n'.join( linesA ), '\n'.join( linesB )
+
+def corpus_replaced_block( rng, lines ):
+	# half the file replaced wholesale
+	quarter = lines // 4
+	head = [ 'header %d' % i for i in range( quarter ) ]
+	tail = [ 'footer %d' % i for i in range( quarter ) ]
+	blockA = [ 'old generated %x' % rng.getrandbits( 48 ) for i in range( lines - 2 * quarter ) ]
+	blockB = [ 'new generated %x' % rng.getrandbits( 48 ) for i in range( lines - 2 * quarter ) ]
+	return '\n'.join( head + blockA + tail ), '\n'.join( head + blockB + tail )
+
+CORPORA = [
+	( 'scattered_edits', corpus_scattered_edits ),
+	( 'small_hunks', corpus_small_hunks ),
+	( 'replaced_block', corpus_replaced_block ),
+]
+
+LINES = [ 25000, 100000, 400000 ]
+
+
+def run_case( name, textA, textB, options ):
+	gc.collect()
+	tracemalloc.start()
+	linesA = textA.splitlines( False )
+	linesB = textB.splitlines( False )
+	result = compare.compare_lines( linesA, linesB, options )
+	for buffer in result.buffers():
+		for piece in compare.join_pieces( buffer ):
+			pass
+	kept, peak = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+
+	inputBytes = sys.getsizeof( textA ) + sys.getsizeof( textB )
+	return {
+		'name': name,
+		'lines': len( linesA ),
+		'input_bytes': inputBytes,
+		'peak_bytes': peak,
+		'kept_bytes': kept,
+		'ratio': float( peak ) / inputBytes,
+	}
+
+
+def main():
+	parser = argparse.ArgumentParser( description='Measure peak memory of the comparison core against input size' )
+	parser.add_argument( '--lines', type=int, action='append', help='lines per side (repeatable), default %s' % LINES )
+	parser.add_argument( '--only', action='append', help='only run the named corpus (repeatable)' )
+	parser.add_argument( '--algorithm', default=None, help='diff_algorithm setting to use' )
+	parser.add_argument( '--seed', type=int, default=1234 )
+	parser.add_argument( '--max-ratio', type=float, help='exit with an error if any peak is more than this many times the input' )
+	parser.add_argument( '--json', help='write results to this file' )
+	args = parser.parse_args()
+
+	options = {}
+	if args.algorithm:
+		options['diff_algorithm'] = args.algorithm
+
+	results = []
+	print( '%-16s %8s %10s %10s %10s %7s' % ( 'corpus', 'lines', 'input KB', 'peak KB', 'kept KB', 'ratio' ) )
+	for name, build in CORPORA:
+		if args.only and name not in args.only:
+			continue
+		for lines in args.lines or LINES:
+			textA, textB = build( random.Random( args.seed ), lines )
+			case = run_case( name, textA, textB, options )
+			results.append( case )
+			print( '%-16s %8d %10d %10d %10d %7.2f' % ( name, case['lines'], case['input_bytes'] // 1024, case['peak_bytes'] // 1024, case['kept_bytes'] // 1024, case['ratio'] ) )
+
+	if args.json:
+		with open( args.json, 'w' ) as f:
+			json.dump( { 'options': compare.read_options( options ), 'results': results }, f, indent=4 )
+
+	if args.max_ratio is not None:
+		worst = max( case['ratio'] for case in results )
+		if worst > args.max_ratio:
+			print( 'peak memory is %.2f times the input, over the limit of %.2f' % ( worst, args.max_ratio ) )
+			sys.exit( 1 )
+
+
+if __name__ == '__main__':
+	main()
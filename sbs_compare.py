@@ -1,643 +1,1531 @@
-import os
-import difflib
-
-import sublime
-import sublime_plugin
-
-
-def sbs_settings():
-	return sublime.load_settings( 'SBSCompare.sublime-settings' )
-	
-
-class EraseViewCommand( sublime_plugin.TextCommand ):
-	def run( self, edit ):
-		self.view.erase( edit, sublime.Region( 0, self.view.size() ) )
-
-class InsertViewCommand( sublime_plugin.TextCommand ):
-	def run( self, edit, string='' ):
-		self.view.insert( edit, self.view.size(), string )
-
-
-class SbsLayoutPreserver( sublime_plugin.EventListener ):
-	def count_views( self, ignore=None ):
-		numCompare = 0
-		numNotCompare = 0
-		nonCompareWin = None
-		for w in sublime.windows():
-			for v in w.views():
-				if ignore and v.id() == ignore:
-					continue
-				if v.settings().get( 'is_sbs_compare' ):
-					numCompare += 1
-				else:
-					numNotCompare += 1
-					nonCompareWin = w
-			if len( w.views() ) == 0:
-				nonCompareWin = w
-		return { 'compare': numCompare, 'notCompare': numNotCompare, 'nonCompareWin': nonCompareWin }
-	
-	def on_pre_close( self, view ):
-		# if one comparison view is closed, close the other
-		if view.settings().get( 'is_sbs_compare' ):
-			win = view.window()
-			sublime.set_timeout( lambda: win.run_command( 'close_window' ), 10 )
-			return
-		
-		# if there are no non-comparison views open after this closes...
-		count = self.count_views( ignore=view.id() )
-		if count['compare'] > 0 and count['notCompare'] == 0:
-			last_file = view.file_name()
-			
-			# wait until the view is closed, then check again
-			def after_close():
-				# if there's no non-comparison window still open, make a new one
-				# (there will be if the user only closes a tab!)
-				count = self.count_views()		
-				if count['nonCompareWin'] is None:
-					sublime.active_window().run_command( 'new_window' )
-					win = sublime.active_window()
-					
-					# attempt to restore sidebar and menu visibility
-					if sbs_settings().get( 'toggle_sidebar', False ):
-						win.run_command( 'toggle_side_bar' )
-					if sbs_settings().get( 'toggle_menu', False ):
-						win.run_command( 'toggle_menu' )
-					
-					# reopen last file
-					if last_file is not None:
-						win.open_file( last_file )
-					
-					sublime.set_timeout( lambda: win.show_quick_panel( [ 'Please close all comparison windows first' ], None ), 10 )
-					
-			sublime.set_timeout( after_close, 100 )
-			
-			
-def generate_colour_scheme( view, generate=True ):
-	# make sure we have hex AND we're >= ST3 (load_resource doesn't work in ST2)	
-	colour_removed = sbs_settings().get( 'remove_colour', 'invalid.illegal' )
-	colour_added = sbs_settings().get( 'add_colour', 'string' )
-	colour_modified_deletion = sbs_settings().get( 'modified_colour_deletion', 'support.class' )
-	colour_modified_addition = sbs_settings().get( 'modified_colour_addition', 'support.class' )
-	colour_text = sbs_settings().get( 'text_colour', '' )
-	
-	notHex = False
-	for col in [ colour_removed, colour_added, colour_modified_deletion, colour_modified_addition ]:
-		if not '#' in col:
-			notHex = True
-	
-	if int( sublime.version() ) < 3000 or notHex:
-		return { 'removed': colour_removed, 'added': colour_added, 'modified_deletion': colour_modified_deletion, 'modified_addition': colour_modified_addition }
-	
-	
-	# generate theme strings
-	colourStrings = {}
-	colourHexes = {}
-	for col in [ [ 'removed', colour_removed ], [ 'added', colour_added ], [ 'modified_deletion', colour_modified_deletion ], [ 'modified_addition', colour_modified_addition ] ]:
-		colourStrings[ col[0] ] = 'comparison.' + col[0]
-		colourHexes[ col[0] ] = col[1]
-	
-	# relative for settings, absolute for writing to file
-	# forwardSlashesOnly brought to you by Windows
-	def theme_file( abs, folderOnly=False, forwardSlashesOnly=False ):
-		package_dir = os.path.basename( sublime.packages_path() )
-		if abs:
-			package_dir = sublime.packages_path()
-			
-		folder = os.path.join( package_dir, 'User' )
-		if forwardSlashesOnly:
-			folder = folder.replace( '\\', '/' )
-		if folderOnly:
-			return folder
-			
-		file = os.path.join( folder, 'SBSCompare.tmTheme' )
-		if forwardSlashesOnly:
-			file = file.replace( '\\', '/' )
-		return file
-	
-	# generate modified theme
-	if generate:		
-		# loop through colours and generate their xml
-		xml = ''
-		xml_tmpl = '<dict><key>name</key><string>{}</string><key>scope</key><string>{}</string><key>settings</key><dict><key>background</key><string>{}</string><key>foreground</key><string>{}</string></dict></dict>'
-		
-		for name in colourStrings:
-			string = colourStrings[name]
-			chex = colourHexes[name]
-			xml += xml_tmpl.format( 'Comparison ' + name, string, chex, colour_text )
-			
-		# get current scheme xml
-		current_scheme = view.settings().get( 'color_scheme' )  # no 'u' >:(
-		scheme = sublime.load_resource( current_scheme )
-		
-		# combiiiiiiiiiiiiine
-		dropzone = scheme.rfind( '</array>' )
-		data = scheme[:dropzone] + xml + scheme[dropzone:]
-		
-		if not os.path.exists( theme_file( abs=True, folderOnly=True ) ):
-			os.makedirs( theme_file( abs=True, folderOnly=True ) )
-		
-		# save new theme
-		with open( theme_file( abs=True ), 'w', encoding='utf-8' ) as f:
-			f.write( data )
-	
-	# set view to use new theme
-	view.settings().set( 'color_scheme', theme_file( abs=False, forwardSlashesOnly=True ) )
-	return colourStrings
-
-
-sbs_markedSelection = [ '', '' ]
-sbs_files = []
-class SbsMarkSelCommand( sublime_plugin.TextCommand ):
-	def run( self, edit ):
-		global sbs_markedSelection
-		
-		window = sublime.active_window()
-		view = window.active_view()
-		sel = view.sel()
-
-		region = sel[0]
-		selectionText = view.substr( region )
-		
-		sbs_markedSelection[0] = sbs_markedSelection[1]
-		sbs_markedSelection[1] = selectionText
-		
-class SbsCompareFilesCommand( sublime_plugin.ApplicationCommand ):
-	def run( self, A=None, B=None ):
-		global sbs_files
-		
-		if A == None or B == None:
-			print( 'Compare Error: file(s) not specified' )
-			return
-			
-		A = os.path.abspath( A )
-		B = os.path.abspath( B )
-		if not os.path.isfile( A ) or not os.path.isfile( B ):
-			print( 'Compare Error: file(s) not found' )
-			return
-			
-		del sbs_files[:]
-		sbs_files.append( A )
-		sbs_files.append( B )
-		
-		print( 'Comparing "%s" and "%s"' % ( A, B ) )
-		
-		window = sublime.active_window()
-		window.run_command( 'sbs_compare' )
-
-class SbsCompareCommand( sublime_plugin.TextCommand ):			
-	def get_view_contents( self, view ):
-		selection = sublime.Region( 0, view.size() )
-		content = view.substr( selection )
-		return content
-		
-	def close_view( self, view ):
-		parent = view.window()
-		parent.focus_view( view )
-		parent.run_command( "close_file" )
-		
-	def get_drawtype( self ):
-		# fill highlighting (DRAW_NO_OUTLINE) only exists on ST3+
-		drawType = sublime.DRAW_OUTLINED
-		if int( sublime.version() ) >= 3000:
-			if not sbs_settings().get( 'outlines_only', False ):
-				drawType = sublime.DRAW_NO_OUTLINE
-		return drawType
-		
-	def highlight_lines( self, view, lines, sublines, col ):
-		# full line diffs
-		regionList = []
-		markers = []
-		for lineNum in lines:
-			lineStart = view.text_point( lineNum, 0 )
-			markers.append( lineStart )
-			
-			for sub in (sub for sub in sublines if sub[0] == lineNum):
-				subStart = view.text_point( lineNum, sub[1] )
-				subEnd = view.text_point( lineNum, sub[2] )
-				
-				region = sublime.Region( lineStart, subStart )
-				regionList.append( region )
-				
-				lineStart = subEnd
-				
-			lineEnd = view.text_point( lineNum+1, -1 )
-			region = sublime.Region( lineStart, lineEnd )
-			regionList.append( region )
-			
-		colour = self.colours['removed']
-		if col == 'B':
-			colour = self.colours['added']
-
-		drawType = self.get_drawtype()			
-		view.add_regions( 'diff_highlighted-' + col, regionList, colour, '', drawType )
-		view.settings().set( 'sbs_markers', markers )
-		
-	def sub_highlight_lines( self, view, lines, col ):
-		# intra-line diffs
-		regionList = []
-		for diff in lines:
-			lineNum = diff[0]
-			start = view.text_point( lineNum, diff[1] )
-			end = view.text_point( lineNum, diff[2] )
-			
-			region = sublime.Region( start, end )
-			regionList.append( region )
-		
-		colour = self.colours['modified_deletion']
-		if col == 'B':
-			colour = self.colours['modified_addition']
-			
-		drawType = self.get_drawtype()			
-		view.add_regions( 'diff_intraline-' + col, regionList, colour, '', drawType )
-				
-		
-	def compare_views( self, view1, view2 ):
-		view1_contents = self.get_view_contents( view1 )
-		view2_contents = self.get_view_contents( view2 )
-		
-		linesA = view1_contents.splitlines( False )
-		linesB = view2_contents.splitlines( False )
-		
-		bufferA = []
-		bufferB = []
-		
-		highlightA = []
-		highlightB = []
-		
-		subHighlightA = []
-		subHighlightB = []
-		
-		diff = difflib.ndiff( linesA, linesB, charjunk = None )	
-		
-		hasDiffA = False
-		hasDiffB = False
-		intraLineA = ''
-		intraLineB = ''
-		hasIntraline = False
-			
-		lineNum = 0
-		for line in diff:
-			lineNum += 1
-			
-			code = line[:2]
-			text = line[2:]
-			
-			if code == '- ':
-				bufferA.append( text )
-				bufferB.append( '' )
-				highlightA.append( lineNum - 1 )
-				intraLineA = text
-				hasDiffA = True
-			elif code == '+ ':
-				bufferA.append( '' )
-				bufferB.append( text )
-				highlightB.append( lineNum - 1 )
-				intraLineB = text
-				hasDiffB = True
-			elif code == '  ':
-				bufferA.append( text )
-				bufferB.append( text )
-				hasDiffA = False
-				hasDiffB = False
-			elif code == '? ':
-				lineNum -= 1
-				hasIntraline = True
-			else:
-				lineNum -= 1
-				
-			if hasIntraline and hasDiffA and hasDiffB:		
-				if sbs_settings().get( 'enable_intraline', True ):
-					s = difflib.SequenceMatcher( None, intraLineA, intraLineB )
-					for tag, i1, i2, j1, j2 in s.get_opcodes():
-						if tag != 'equal': # == replace
-							lnA = lineNum-2
-							lnB = lineNum-1
-							
-							if sbs_settings().get( 'intraline_emptyspace', False ):
-								if tag == 'insert':
-									i2 += j2 - j1
-								if tag == 'delete':
-									j2 += i2 - i1
-							
-							subHighlightA.append( [ lnA, i1, i2 ] )
-							subHighlightB.append( [ lnB, j1, j2 ] )
-				hasDiffA = False
-				hasDiffB = False
-				hasIntraline = False
-									
-						
-		window = sublime.active_window()
-		
-		window.focus_view( view1 )
-		window.run_command( 'erase_view' )
-		window.run_command( 'insert_view', { 'string': '\n'.join( bufferA ) } )
-		
-		window.focus_view( view2 )
-		window.run_command( 'erase_view' )
-		window.run_command( 'insert_view', { 'string': '\n'.join( bufferB ) } )
-		
-		self.highlight_lines( view1, highlightA, subHighlightA, 'A' )			
-		self.highlight_lines( view2, highlightB, subHighlightB, 'B' )
-		
-		intraDiff = ''
-		if sbs_settings().get( 'enable_intraline', True ):
-			self.sub_highlight_lines( view1, subHighlightA, 'A' )
-			self.sub_highlight_lines( view2, subHighlightB, 'B' )
-			
-			numIntra = len( subHighlightA ) + len( subHighlightB )
-			intraDiff =  str( numIntra ) + ' intra-line modifications\n'
-		
-		if sbs_settings().get( 'line_count_popup', False ):
-			numDiffs = len( highlightA ) + len( highlightB )
-			sublime.message_dialog( intraDiff + str( len( highlightA ) ) + ' lines removed, ' + str( len( highlightB ) ) + ' lines added\n' + str( numDiffs ) + ' line differences total' )
-
-		
-	def run( self, edit, with_active = False, group = -1, index = -1, compare_selections = False ):		
-		global sbs_markedSelection, sbs_files
-		
-		active_view = self.view
-		active_window = active_view.window()
-		active_id = active_view.id()
-		
-		openTabs = []
-		
-		for view in active_window.views():
-			if view.id() != active_id:
-				viewName = 'untitled'
-				if view.file_name():
-					viewName = view.file_name()
-				elif view.name():
-					viewName = view.name()
-				openTabs.append( [ viewName, view ] )
-
-		def create_comparison( view1_contents, view2_contents, syntax, name1_override = False, name2_override = False ):
-			view1_syntax = syntax
-			view2_syntax = syntax
-			
-			# make new window
-			active_window.run_command( 'new_window' )		
-			new_window = sublime.active_window()
-			new_window.set_layout( { "cols": [0.0, 0.5, 1.0], "rows": [0.0, 1.0], "cells": [[0, 0, 1, 1], [1, 0, 2, 1]] } )
-			
-			if sbs_settings().get( 'toggle_sidebar', False ):
-				new_window.run_command( 'toggle_side_bar' )
-			if sbs_settings().get( 'toggle_menu', False ):
-				new_window.run_command( 'toggle_menu' )
-			
-			# view 1
-			new_window.run_command( 'new_file' )
-			new_window.run_command( 'insert_view', { 'string': view1_contents } )
-			new_window.active_view().set_syntax_file( view1_syntax )
-			
-			view1_name = 'untitled'
-			if active_view.file_name():
-				view1_name = active_view.file_name()
-			elif active_view.name():
-				view1_name = active_view.name()
-			if name1_override != False:
-				view1_name = name1_override
-			new_window.active_view().set_name( os.path.basename( view1_name ) + ' (active)' )
-				
-			new_window.active_view().set_scratch( True )	
-			view1 = new_window.active_view()
-			
-			# view 2
-			new_window.run_command( 'new_file' )
-			new_window.run_command( 'insert_view', { 'string': view2_contents } )
-			new_window.active_view().set_syntax_file( view2_syntax )
-			new_window.active_view().set_name( os.path.basename( name2_override ) + ' (other)' )
-			
-			# move view 2 to group 2
-			new_window.set_view_index( new_window.active_view(), 1, 0 )
-			
-			new_window.active_view().set_scratch( True )
-			view2 = new_window.active_view()
-			
-			# keep track of these views			
-			view1.settings().set( "is_sbs_compare", True )
-			view2.settings().set( "is_sbs_compare", True )
-			
-			# disable word wrap
-			view1.settings().set( 'word_wrap', 'false' )
-			view2.settings().set( 'word_wrap', 'false' )
-			
-			# generate and set colour scheme
-			self.colours = generate_colour_scheme( view1 )
-			generate_colour_scheme( view2, generate=False )
-			
-			# run diff
-			self.compare_views( view1, view2 )
-			
-			# make readonly
-			new_window.focus_view( view1 )
-			if sbs_settings().get( 'read_only', False ):
-				new_window.active_view().set_read_only( True )
-				
-			new_window.focus_view( view2 )
-			if sbs_settings().get( 'read_only', False ):
-				new_window.active_view().set_read_only( True )
-			
-			# activate scroll syncer				
-			ViewScrollSyncer( new_window, [ view1, view2 ] )
-			
-			# move views to top left
-			view1.set_viewport_position( (0, 0), False )
-			view2.set_viewport_position( (0, 0), False )
-			
-			# move cursors to top left
-			origin = view.text_point( 0, 0 )
-			
-			view1.sel().clear()
-			view1.sel().add( sublime.Region( origin ) )
-			view1.show( origin )
-			
-			view2.sel().clear()
-			view2.sel().add( sublime.Region( origin ) )
-			view2.show( origin )
-			
-			# focus first view
-			new_window.focus_view( view1 )
-
-		def on_click( index ):
-			if index > -1:
-				# get original views' data
-				view1_contents = self.get_view_contents( active_view )
-				view2_contents = self.get_view_contents( openTabs[index][1] )
-				
-				syntax = active_view.settings().get( 'syntax' )
-				
-				create_comparison( view1_contents, view2_contents, syntax, False, openTabs[index][0] )
-				
-		def compare_from_views( view1, view2 ):
-			if view1.is_loading() or view2.is_loading():
-				sublime.set_timeout( lambda: compare_from_views( view1, view2 ), 10 )
-			else:				
-				view1_contents = self.get_view_contents( view1 )
-				view2_contents = self.get_view_contents( view2 )
-				syntax = view1.settings().get( 'syntax' )
-				
-				self.close_view( view1 )
-				self.close_view( view2 )
-				
-				create_comparison( view1_contents, view2_contents, syntax, file1, file2 )
-
-		if len( sbs_files ) > 0:
-			file1 = sbs_files[0]
-			file2 = sbs_files[1]
-			
-			view1 = active_window.open_file( file1 )
-			view2 = active_window.open_file( file2 )
-			
-			compare_from_views( view1, view2 )			
-			del sbs_files[:]
-		elif compare_selections == True:
-			selA = sbs_markedSelection[0]
-			selB = sbs_markedSelection[1]
-			
-			sel = active_view.sel()
-			
-			selNum = 0
-			for selection in sel:
-				selNum += 1
-			
-			if selNum == 2:
-				selA = active_view.substr( sel[0] )
-				selB = active_view.substr( sel[1] )
-			
-			syntax = active_view.settings().get( 'syntax' )
-			create_comparison( selA, selB, syntax, 'selection A', 'selection B' )
-		elif len( openTabs ) == 1:
-			on_click( 0 )
-		else:
-			if with_active == True:
-				active_group, active_group_index = active_window.get_view_index( active_view )
-				
-				if group == -1 and index == -1:
-					group = 0 if active_group == 1 else 1
-					other_active_view = active_window.active_view_in_group( group )
-					index = active_window.get_view_index( other_active_view )[1]
-				
-				if index > active_group_index:
-					index -= 1
-					
-				if group > active_group:
-					index += len( active_window.views_in_group( active_group ) ) - 1
-				elif group < active_group:
-					index += 1
-					
-				on_click( index )	
-			else:
-				menu_items = []
-				for tab in openTabs:
-					fileName = tab[0]
-					if sbs_settings().get( 'expanded_filenames', False ):
-						menu_items.append( [ os.path.basename( fileName ), fileName ] )
-					else:
-						menu_items.append( os.path.basename( fileName ) )	
-				sublime.set_timeout( self.view.window().show_quick_panel( menu_items, on_click ) )
-
-
-class ViewScrollSyncer( object ):
-	def __init__( self, window, viewList ):
-		self.window = window
-		self.views = viewList
-		self.timeout_focused = 10
-		self.timeout_unfocused = 50
-		
-		self.run()
-		
-	def update_scroll( self, view1, view2, lastUpdated ):
-		if lastUpdated == 'A':
-			view2.set_viewport_position( view1.viewport_position(), False )
-		elif lastUpdated == 'B':
-			view1.set_viewport_position( view2.viewport_position(), False )
-		
-	def run( self ):
-		if not self.window:
-			return
-		
-		if self.window.id() != sublime.active_window().id():
-			sublime.set_timeout( self.run, self.timeout_unfocused )
-			return
-			
-		view1 = self.views[0]
-		view2 = self.views[1]
-		
-		if not view1 or not view2:
-			return
-		
-		vecA = view1.viewport_position()
-		vecB = view2.viewport_position()
-		
-		if vecA != vecB:
-			lastVecA0 = view1.settings().get( 'viewsync_last_vec0', 1 )
-			lastVecA1 = view1.settings().get( 'viewsync_last_vec1', 1 )
-			
-			lastVecB0 = view2.settings().get( 'viewsync_last_vec0', 1 )
-			lastVecB1 = view2.settings().get( 'viewsync_last_vec1', 1 )
-			
-			lastVecA = ( lastVecA0, lastVecA1 )
-			lastVecB = ( lastVecB0, lastVecB1 )
-			
-			lastUpdated = ''
-			
-			if lastVecA != vecA:				
-				lastUpdated = 'A'
-				
-				view1.settings().set( 'viewsync_last_vec0', vecA[0] )
-				view1.settings().set( 'viewsync_last_vec1', vecA[1] )
-				
-				view2.settings().set( 'viewsync_last_vec0', vecA[0] )
-				view2.settings().set( 'viewsync_last_vec1', vecA[1] )				
-				
-			if lastVecB != vecB:				
-				lastUpdated = 'B'
-				
-				view1.settings().set( 'viewsync_last_vec0', vecB[0] )
-				view1.settings().set( 'viewsync_last_vec1', vecB[1] )
-				
-				view2.settings().set( 'viewsync_last_vec0', vecB[0] )
-				view2.settings().set( 'viewsync_last_vec1', vecB[1] )
-				
-			if ( lastUpdated != '' ):
-				self.update_scroll( view1, view2, lastUpdated )
-		
-		sublime.set_timeout( self.run, self.timeout_focused )
-
-					
-def sbs_scroll_to( view, prev=False ):
-	current_pos = view.sel()[0].begin()
-	for col in [ 'A', 'B' ]:
-		regions = view.settings().get( 'sbs_markers' )
-		if prev:
-			regions.reverse()
-		
-		for highlight in regions:			
-			found = False
-			if prev:
-				if highlight < current_pos:
-					found = True
-			else:
-				if highlight > current_pos:
-					found = True
-					
-			if found:
-				view.sel().clear()
-				view.sel().add( sublime.Region( highlight ) )
-				view.show( highlight )
-				
-				# sometimes necessary, better safe than sorry
-				sublime.set_timeout( lambda: view.show( highlight ), 10 )
-				return
-				
-	msg = 'Reached the '
-	msg += 'beginning' if prev else 'end'
-	view.window().show_quick_panel( [ msg ], None )		
-					
-class SbsPrevDiffCommand( sublime_plugin.TextCommand ):
-	def run( self, edit, string='' ):
-		sbs_scroll_to( self.view, prev=True )
-					
-class SbsNextDiffCommand( sublime_plugin.TextCommand ):
-	def run( self, edit, string='' ):
-		sbs_scroll_to( self.view )
+import os
+import hashlib
+import time
+import bisect
+import threading
+import itertools
+import collections
+
+import sublime
+import sublime_plugin
+
+from .sbs_core import compare
+from .sbs_core import fileio
+from .sbs_core import dirs
+from .sbs_core import merge
+from .sbs_core import cache
+from .sbs_core import stats
+from .sbs_core import batch
+from .sbs_core import export
+
+
+def sbs_settings():
+	return sublime.load_settings( 'SBSCompare.sublime-settings' )
+	
+def syntax_for_file( path, default ):
+	# ST4 can look a syntax up without opening the file, older builds get the default
+	if hasattr( sublime, 'find_syntax_for_file' ):
+		syntax = sublime.find_syntax_for_file( path )
+		if syntax is not None:
+			return syntax.path
+	return default
+	
+
+class InsertViewCommand( sublime_plugin.TextCommand ):
+	def run( self, edit, string='' ):
+		self.view.insert( edit, self.view.size(), string )
+
+
+# text on its way into a view, command arguments get serialised so big strings
+# are handed over by key instead
+sbs_pending_text = {}
+sbs_pending_keys = itertools.count()
+
+def fill_view( view, string, begin=0, end=None ):
+	# replace begin to end (the whole view by default) with string in one edit,
+	# string can also be an iterable of pieces that are inserted one after another
+	key = str( next( sbs_pending_keys ) )
+	sbs_pending_text[key] = string
+	try:
+		view.run_command( 'sbs_fill_view', { 'key': key, 'begin': begin, 'end': view.size() if end is None else end } )
+	finally:
+		sbs_pending_text.pop( key, None )
+
+class SbsFillViewCommand( sublime_plugin.TextCommand ):
+	def run( self, edit, key, begin=0, end=0 ):
+		string = sbs_pending_text.pop( key, None )
+		if string is None:
+			return
+		if isinstance( string, str ):
+			self.view.replace( edit, sublime.Region( begin, end ), string )
+			return
+		self.view.erase( edit, sublime.Region( begin, end ) )
+		for piece in string:
+			begin += self.view.insert( edit, begin, piece )
+
+
+# open comparisons: view ids by comparison window id, and the window id of each view,
+# kept up to date here so closing a tab never has to look through every view
+sbs_windows = {}
+sbs_view_windows = {}
+
+def register_comparison( window, views ):
+	sbs_windows[window.id()] = set( view.id() for view in views )
+	for view in views:
+		sbs_view_windows[view.id()] = window.id()
+
+def unregister_view( viewId ):
+	windowId = sbs_view_windows.pop( viewId, None )
+	views = sbs_windows.get( windowId )
+	if views is not None:
+		views.discard( viewId )
+		if not views:
+			del sbs_windows[windowId]
+
+def normal_windows():
+	# windows that aren't comparisons
+	return [ w for w in sublime.windows() if w.id() not in sbs_windows ]
+
+
+class SbsLayoutPreserver( sublime_plugin.EventListener ):
+	def on_pre_close( self, view ):
+		# if one comparison view is closed, close the other
+		windowId = sbs_view_windows.get( view.id() )
+		if windowId is not None:
+			for job in sbs_jobs:
+				if view in job.views:
+					job.cancel()
+			
+			# the whole comparison goes, no need to wait for its views to close one by one
+			for viewId in sbs_windows.get( windowId, () ):
+				for registry in [ sbs_syncers, sbs_comparisons ]:
+					owner = registry.get( viewId )
+					if owner is not None:
+						owner.close()
+			
+			win = view.window()
+			sublime.set_timeout( lambda: win.run_command( 'close_window' ), 10 )
+			return
+		
+		# nothing to do unless this could be the last window that isn't a comparison
+		if not sbs_windows or len( normal_windows() ) > 1:
+			return
+		
+		last_file = view.file_name()
+		
+		# wait until the view is closed, then check again
+		def after_close():
+			# if there's no non-comparison window still open, make a new one
+			# (there will be if the user only closes a tab!)
+			if sbs_windows and not normal_windows():
+				sublime.active_window().run_command( 'new_window' )
+				win = sublime.active_window()
+				
+				# attempt to restore sidebar and menu visibility
+				if sbs_settings().get( 'toggle_sidebar', False ):
+					win.run_command( 'toggle_side_bar' )
+				if sbs_settings().get( 'toggle_menu', False ):
+					win.run_command( 'toggle_menu' )
+				
+				# reopen last file
+				if last_file is not None:
+					win.open_file( last_file )
+				
+				sublime.set_timeout( lambda: win.show_quick_panel( [ 'Please close all comparison windows first' ], None ), 10 )
+				
+		sublime.set_timeout( after_close, 100 )
+		
+	def on_close( self, view ):
+		unregister_view( view.id() )
+			
+			
+sbs_generated_schemes = {}
+def generate_colour_scheme( view, generate=True ):
+	# make sure we have hex AND we're >= ST3 (load_resource doesn't work in ST2)	
+	colour_removed = sbs_settings().get( 'remove_colour', 'invalid.illegal' )
+	colour_added = sbs_settings().get( 'add_colour', 'string' )
+	colour_modified_deletion = sbs_settings().get( 'modified_colour_deletion', 'support.class' )
+	colour_modified_addition = sbs_settings().get( 'modified_colour_addition', 'support.class' )
+	colour_conflict = sbs_settings().get( 'conflict_colour', 'invalid.deprecated' )
+	colour_moved = sbs_settings().get( 'moved_colour', 'constant.numeric' )
+	colour_text = sbs_settings().get( 'text_colour', '' )
+	
+	notHex = False
+	for col in [ colour_removed, colour_added, colour_modified_deletion, colour_modified_addition, colour_conflict, colour_moved ]:
+		if not '#' in col:
+			notHex = True
+	
+	if int( sublime.version() ) < 3000 or notHex:
+		return { 'removed': colour_removed, 'added': colour_added, 'modified_deletion': colour_modified_deletion, 'modified_addition': colour_modified_addition, 'conflict': colour_conflict, 'moved': colour_moved }
+	
+	
+	# generate theme strings
+	colourStrings = {}
+	colourHexes = {}
+	for col in [ [ 'removed', colour_removed ], [ 'added', colour_added ], [ 'modified_deletion', colour_modified_deletion ], [ 'modified_addition', colour_modified_addition ], [ 'conflict', colour_conflict ], [ 'moved', colour_moved ] ]:
+		colourStrings[ col[0] ] = 'comparison.' + col[0]
+		colourHexes[ col[0] ] = col[1]
+	
+	# relative for settings, absolute for writing to file
+	# forwardSlashesOnly brought to you by Windows
+	def theme_file( abs, name='', folderOnly=False, forwardSlashesOnly=False ):
+		package_dir = os.path.basename( sublime.packages_path() )
+		if abs:
+			package_dir = sublime.packages_path()
+			
+		folder = os.path.join( package_dir, 'User', 'SBSCompare' )
+		if forwardSlashesOnly:
+			folder = folder.replace( '\\', '/' )
+		if folderOnly:
+			return folder
+			
+		file = os.path.join( folder, name )
+		if forwardSlashesOnly:
+			file = file.replace( '\\', '/' )
+		return file
+	
+	current_scheme = view.settings().get( 'color_scheme' )  # no 'u' >:(
+	
+	# generated themes are named after the scheme they came from plus a hash of
+	# everything that goes into them, so they only get rewritten when that changes
+	if generate or current_scheme not in sbs_generated_schemes:
+		scheme = sublime.load_resource( current_scheme )
+		
+		fingerprint = hashlib.sha1()
+		for part in [ current_scheme, scheme, colour_removed, colour_added, colour_modified_deletion, colour_modified_addition, colour_conflict, colour_moved, colour_text ]:
+			fingerprint.update( part.encode( 'utf-8' ) )
+			fingerprint.update( b'\0' )
+		
+		prefix = 'SBSCompare-%s-%s-' % ( os.path.splitext( os.path.basename( current_scheme ) )[0], hashlib.sha1( current_scheme.encode( 'utf-8' ) ).hexdigest()[:6] )
+		name = prefix + fingerprint.hexdigest()[:12] + '.tmTheme'
+		
+		# generate modified theme
+		if not os.path.exists( theme_file( abs=True, name=name ) ):
+			# loop through colours and generate their xml
+			xml = ''
+			xml_tmpl = '<dict><key>name</key><string>{}</string><key>scope</key><string>{}</string><key>settings</key><dict><key>background</key><string>{}</string><key>foreground</key><string>{}</string></dict></dict>'
+			
+			for colourName in sorted( colourStrings ):
+				string = colourStrings[colourName]
+				chex = colourHexes[colourName]
+				xml += xml_tmpl.format( 'Comparison ' + colourName, string, chex, colour_text )
+			
+			# combiiiiiiiiiiiiine
+			dropzone = scheme.rfind( '</array>' )
+			data = scheme[:dropzone] + xml + scheme[dropzone:]
+			
+			folder = theme_file( abs=True, folderOnly=True )
+			if not os.path.exists( folder ):
+				os.makedirs( folder )
+			
+			# drop outdated versions of this scheme, other schemes keep theirs
+			for old in os.listdir( folder ):
+				if old.startswith( prefix ):
+					os.remove( os.path.join( folder, old ) )
+			
+			# save new theme
+			with open( theme_file( abs=True, name=name ), 'w', encoding='utf-8' ) as f:
+				f.write( data )
+				
+		sbs_generated_schemes[current_scheme] = name
+	
+	# set view to use new theme
+	view.settings().set( 'color_scheme', theme_file( abs=False, name=sbs_generated_schemes[current_scheme], forwardSlashesOnly=True ) )
+	return colourStrings
+
+
+def hex_colours():
+	# the colour settings that are hex values, for anything drawn in html
+	colours = dict( export.DEFAULT_HTML_COLOURS )
+	colours['conflict'] = '#d08770'
+	colours['moved'] = '#b48ead'
+	for key, setting in [ ( 'removed', 'remove_colour' ), ( 'added', 'add_colour' ), ( 'modified_deletion', 'modified_colour_deletion' ), ( 'modified_addition', 'modified_colour_addition' ), ( 'conflict', 'conflict_colour' ), ( 'moved', 'moved_colour' ) ]:
+		colour = sbs_settings().get( setting, '' )
+		if colour.startswith( '#' ):
+			colours[key] = colour
+	return colours
+
+
+sbs_markedSelection = [ '', '' ]
+
+# ( A, B, base ) per sbs_compare_files call, taken in order by sbs_compare
+sbs_files = collections.deque()
+class SbsMarkSelCommand( sublime_plugin.TextCommand ):
+	def run( self, edit ):
+		global sbs_markedSelection
+		
+		window = sublime.active_window()
+		view = window.active_view()
+		sel = view.sel()
+
+		region = sel[0]
+		selectionText = view.substr( region )
+		
+		sbs_markedSelection[0] = sbs_markedSelection[1]
+		sbs_markedSelection[1] = selectionText
+		
+class SbsCompareFilesCommand( sublime_plugin.ApplicationCommand ):
+	def run( self, A=None, B=None, base=None ):
+		if A == None or B == None:
+			print( 'Compare Error: file(s) not specified' )
+			return
+			
+		A = os.path.abspath( A )
+		B = os.path.abspath( B )
+		if not os.path.isfile( A ) or not os.path.isfile( B ):
+			print( 'Compare Error: file(s) not found' )
+			return
+			
+		if base is not None:
+			base = os.path.abspath( base )
+			if not os.path.isfile( base ):
+				print( 'Compare Error: base file not found' )
+				return
+			
+		sbs_files.append( ( A, B, base ) )
+		if base is not None:
+			print( 'Comparing "%s" and "%s" against "%s"' % ( A, B, base ) )
+		else:
+			print( 'Comparing "%s" and "%s"' % ( A, B ) )
+		
+		window = sublime.active_window()
+		window.run_command( 'sbs_compare' )
+
+class SbsCompareDirsCommand( sublime_plugin.ApplicationCommand ):
+	def run( self, A=None, B=None, strict=None, dirs=None ):
+		# dirs comes from the side bar, with two folders selected
+		if dirs is not None and len( dirs ) == 2:
+			A, B = dirs
+		
+		if A == None or B == None:
+			print( 'Compare Error: folder(s) not specified' )
+			return
+			
+		A = os.path.abspath( A )
+		B = os.path.abspath( B )
+		if not os.path.isdir( A ) or not os.path.isdir( B ):
+			print( 'Compare Error: folder(s) not found' )
+			return
+		
+		if strict is None:
+			strict = sbs_settings().get( 'dir_compare_strict', False )
+		
+		print( 'Comparing folders "%s" and "%s"' % ( A, B ) )
+		sublime.status_message( 'Comparing folders...' )
+		
+		# walking and hashing happen off the main thread
+		thread = threading.Thread( target=self.compare, args=( A, B, strict ) )
+		thread.daemon = True
+		thread.start()
+		
+	def compare( self, A, B, strict ):
+		lastUpdate = [ 0 ]
+		def progress( phase, done, total ):
+			now = time.time()
+			if now - lastUpdate[0] >= 0.1:
+				lastUpdate[0] = now
+				msg = 'Comparing folders: %d/%d files hashed' % ( done, total )
+				sublime.set_timeout( lambda: sublime.status_message( msg ), 0 )
+		
+		try:
+			entries = dirs.compare_trees( A, B, strict, sbs_settings().get( 'dir_compare_workers', dirs.HASH_WORKERS ), progress )
+		except ( IOError, OSError ) as e:
+			print( 'Compare Error: %s' % e )
+			return
+		
+		sublime.set_timeout( lambda: self.show_entries( A, B, entries ), 0 )
+		
+	def show_entries( self, A, B, entries ):
+		if not entries:
+			sublime.message_dialog( 'No differences between\n%s\nand\n%s' % ( A, B ) )
+			return
+		
+		menu_items = [ [ '[%s] %s' % ( status, path ), os.path.join( B if status == 'added' else A, path ) ] for status, path in entries ]
+		
+		def on_click( index ):
+			if index < 0:
+				return
+			status, path = entries[index]
+			if status == 'modified':
+				sublime.run_command( 'sbs_compare_files', { 'A': os.path.join( A, path ), 'B': os.path.join( B, path ) } )
+			else:
+				# only one side has it, nothing to compare against
+				sublime.active_window().open_file( menu_items[index][1] )
+		
+		sublime.active_window().show_quick_panel( menu_items, on_click )
+		
+	def is_visible( self, A=None, B=None, strict=None, dirs=None ):
+		return dirs is None or len( dirs ) == 2
+
+class SbsCompareBatchCommand( sublime_plugin.ApplicationCommand ):
+	def run( self, manifest=None, pairs=None, report=None, inspect=True ):
+		# pairs is a list of [ A, B ], manifest a file listing them (see batch.read_manifest).
+		# nothing opens until a differing pair is picked from the list afterwards
+		try:
+			if manifest is not None:
+				manifest = os.path.abspath( manifest )
+				pairs = batch.read_manifest( manifest )
+			elif pairs is not None:
+				pairs = [ ( os.path.abspath( A ), os.path.abspath( B ) ) for A, B in pairs ]
+		except ( IOError, OSError, ValueError ) as e:
+			print( 'Compare Error: couldn\'t read the manifest: %s' % e )
+			return
+		
+		if not pairs:
+			print( 'Compare Error: no file pairs specified' )
+			return
+		
+		if report is None:
+			if manifest is not None:
+				report = os.path.splitext( manifest )[0] + '-report.txt'
+			else:
+				report = os.path.join( sublime.packages_path(), 'User', 'SBSCompare', 'batch-report.txt' )
+		report = os.path.abspath( report )
+		
+		print( 'Comparing %d file pairs' % len( pairs ) )
+		sublime.status_message( 'Comparing %d file pairs...' % len( pairs ) )
+		
+		# diffing happens off the main thread
+		thread = threading.Thread( target=self.compare, args=( pairs, report, inspect ) )
+		thread.daemon = True
+		thread.start()
+		
+	def compare( self, pairs, report, inspect ):
+		lastUpdate = [ 0 ]
+		def progress( phase, done, total ):
+			now = time.time()
+			if now - lastUpdate[0] >= 0.1:
+				lastUpdate[0] = now
+				msg = 'Comparing file pairs: %d/%d' % ( done, total )
+				sublime.set_timeout( lambda: sublime.status_message( msg ), 0 )
+		
+		settings = sbs_settings()
+		entries = batch.compare_batch( pairs, compare.read_options( settings ), settings.get( 'fallback_encodings', fileio.DEFAULT_FALLBACK_ENCODINGS ), settings.get( 'batch_compare_workers', batch.BATCH_WORKERS ), progress )
+		try:
+			batch.write_report( report, entries )
+		except ( IOError, OSError ) as e:
+			print( 'Compare Error: couldn\'t write the report: %s' % e )
+			return
+		
+		summary = batch.format_report( entries ).split( '\n', 1 )[0]
+		print( '%s, report written to %s' % ( summary, report ) )
+		sublime.set_timeout( lambda: self.show_entries( entries, summary, inspect ), 0 )
+		
+	def show_entries( self, entries, summary, inspect ):
+		sublime.status_message( summary )
+		different = [ entry for entry in entries if entry['status'] == 'different' ]
+		if not inspect or not different:
+			return
+		
+		menu_items = [ [ '%s -> %s' % ( os.path.basename( entry['A'] ), os.path.basename( entry['B'] ) ), '%d removed, %d added, %d hunks' % ( entry['removed'], entry['added'], len( entry['hunks'] ) ) ] for entry in different ]
+		
+		def on_click( index ):
+			if index > -1:
+				sublime.run_command( 'sbs_compare_files', { 'A': different[index]['A'], 'B': different[index]['B'] } )
+		
+		sublime.active_window().show_quick_panel( menu_items, on_click )
+
+sbs_result_cache = [ None, None ]
+def result_cache():
+	# built from the settings, and again whenever they change
+	if not sbs_settings().get( 'cache_results', True ):
+		return None
+	
+	config = ( sbs_settings().get( 'cache_memory_mb', 64 ), sbs_settings().get( 'cache_disk', False ), sbs_settings().get( 'cache_disk_mb', 256 ) )
+	if sbs_result_cache[0] != config:
+		folder = None
+		if config[1]:
+			folder = os.path.join( sublime.packages_path(), 'User', 'SBSCompare', 'cache' )
+		sbs_result_cache[0] = config
+		sbs_result_cache[1] = cache.ResultCache( config[0] * 1024 * 1024, folder, config[2] * 1024 * 1024 )
+	return sbs_result_cache[1]
+
+sbs_stats = stats.StatsHistory()
+class SbsCompareStatsCommand( sublime_plugin.WindowCommand ):
+	def run( self, export = False ):
+		if export:
+			path = os.path.join( sublime.packages_path(), 'User', 'SBSCompare', 'stats.json' )
+			self.window.show_input_panel( 'Export comparison stats to:', path, self.export, None, None )
+			return
+		
+		view = self.window.new_file()
+		view.set_name( 'Comparison stats' )
+		view.set_scratch( True )
+		view.run_command( 'insert_view', { 'string': sbs_stats.format() } )
+		view.set_read_only( True )
+		
+	def export( self, path ):
+		try:
+			folder = os.path.dirname( path )
+			if folder and not os.path.exists( folder ):
+				os.makedirs( folder )
+			with open( path, 'w', encoding='utf-8' ) as f:
+				f.write( sbs_stats.as_json() )
+		except ( IOError, OSError ) as e:
+			print( 'Compare Error: %s' % e )
+			return
+		sublime.status_message( 'Comparison stats written to %s' % path )
+
+sbs_jobs = []
+class SbsCompareJob( object ):
+	# runs the diff off the main thread, only the result goes back to it
+	def __init__( self, views, texts, on_done, runStats, options, files=None ):
+		# texts are A, B or base, ours, theirs for a three-way comparison.
+		# files, if given, are paths in the same order that are read and
+		# decoded on the worker thread instead (texts is None until then)
+		self.views = views
+		self.texts = texts
+		self.files = files
+		self.fallbackEncodings = sbs_settings().get( 'fallback_encodings', fileio.DEFAULT_FALLBACK_ENCODINGS )
+		self.hexDump = sbs_settings().get( 'binary_hex_dump', True )
+		
+		# the inputs as lines
+		self.lines = None
+		self.stats = runStats
+		self.on_done = on_done
+		self.options = options
+		self.cache = result_cache() if len( views ) == 2 else None
+		self.cancelled = False
+		self.lastStatus = ''
+		self.lastUpdate = 0
+		
+	def window( self ):
+		return self.views[0].window()
+		
+	def start( self ):
+		sbs_jobs.append( self )
+		self.set_status( 'Comparing...' )
+		
+		thread = threading.Thread( target=self.run )
+		thread.daemon = True
+		thread.start()
+		
+	def cancel( self ):
+		self.cancelled = True
+		
+	def set_status( self, msg ):
+		for view in self.views:
+			if msg:
+				view.set_status( 'sbs_compare', msg )
+			else:
+				view.erase_status( 'sbs_compare' )
+		
+	def progress( self, phase, done, total ):
+		if self.cancelled:
+			raise compare.CompareCancelled()
+		
+		# don't flood the main thread with status updates
+		now = time.time()
+		if now - self.lastUpdate < 0.1:
+			return
+		self.lastUpdate = now
+		
+		percent = 100 * done // total if total > 0 else 100
+		msg = 'Comparing: %s %d%% (run "Cancel comparison" to stop)' % ( phase, percent )
+		if msg != self.lastStatus:
+			self.lastStatus = msg
+			sublime.set_timeout( lambda: self.set_status( msg ), 0 )
+		
+	def finish( self, result ):
+		sbs_jobs.remove( self )
+		self.set_status( '' )
+		
+		# comparison window was closed while we were working
+		if self.window() is None:
+			return
+		
+		if result is None:
+			if self.cancelled:
+				sublime.status_message( 'Comparison cancelled' )
+			if self.cancelled or ( self.texts is None and self.lines is None ):
+				# nothing to show, or the files couldn't be read
+				self.window().run_command( 'close_window' )
+			else:
+				# the views are only filled once there's a result, show the inputs as they are
+				inputs = self.texts if self.texts is not None else [ compare.join_pieces( lines ) for lines in self.lines ]
+				for view, text in zip( self.views, inputs ):
+					fill_view( view, text )
+			return
+		
+		self.on_done( result )
+		
+	def read_files( self ):
+		# identical files never get this far, see SbsCompareCommand.precheck_files()
+		with self.stats.stage( 'read_files' ):
+			if len( self.files ) == 2 and self.hexDump and any( fileio.is_binary( path ) for path in self.files ):
+				# rows of fixed size blocks, matched on their bytes and not their offsets.
+				# the options are shared with the comparison, so live re-diffs mask them too
+				self.lines = [ list( fileio.hex_lines( path ) ) for path in self.files ]
+				self.options['ignore_patterns'] = self.options['ignore_patterns'] + [ fileio.HEX_OFFSET_PATTERN ]
+			else:
+				self.texts = [ fileio.read_text( path, self.fallbackEncodings )[0] for path in self.files ]
+		
+	def compare( self ):
+		if self.lines is None:
+			with self.stats.stage( 'split_lines' ):
+				self.lines = [ text.splitlines( False ) for text in self.texts ]
+			self.stats.count( chars_a=len( self.texts[0] ), chars_b=len( self.texts[1] ) )
+		linesA, linesB = self.lines
+		self.stats.count( lines_a=len( linesA ), lines_b=len( linesB ) )
+		
+		# the same inputs and settings always give the same result
+		if self.cache is not None:
+			with self.stats.stage( 'cache_lookup' ):
+				key = cache.cache_key( self.texts if self.texts is not None else self.lines, self.options )
+				packed = self.cache.get( key )
+			if packed is not None:
+				with self.stats.stage( 'cache_unpack' ):
+					return cache.unpack( packed, linesA, linesB )
+		
+		start = time.perf_counter()
+		result = compare.compare_lines( linesA, linesB, self.options, self.progress )
+		seconds = time.perf_counter() - start
+		self.stats.add( 'diff', seconds - result.intralineSeconds )
+		self.stats.add( 'intraline', result.intralineSeconds )
+		self.stats.count( **stats.result_sizes( result ) )
+		
+		if self.cache is not None:
+			with self.stats.stage( 'cache_store' ):
+				self.cache.put( key, cache.pack( result ) )
+		return result
+		
+	def run( self ):
+		result = None
+		try:
+			if self.files is not None:
+				self.read_files()
+			if len( self.views ) == 3:
+				with self.stats.stage( 'diff', lines=sum( text.count( '\n' ) + 1 for text in self.texts ) ):
+					result = merge.compare_three( self.texts[0], self.texts[1], self.texts[2], self.options, self.progress )
+			else:
+				result = self.compare()
+		except compare.CompareCancelled:
+			pass
+		except Exception as e:
+			# e is gone once the except block ends, the message is kept for the main thread
+			msg = 'Compare Error: %s' % e
+			print( msg )
+			sublime.set_timeout( lambda: sublime.status_message( msg ), 0 )
+			
+		sublime.set_timeout( lambda: self.finish( result ), 0 )
+		
+class SbsCancelCompareCommand( sublime_plugin.WindowCommand ):
+	def run( self ):
+		# cancel this window's comparison, or every running comparison if it has none
+		jobs = [ job for job in sbs_jobs if job.window() is not None and job.window().id() == self.window.id() ]
+		if not jobs:
+			jobs = sbs_jobs
+		for job in jobs:
+			job.cancel()
+			
+	def is_enabled( self ):
+		return len( sbs_jobs ) > 0
+
+# row kinds counted for the overview rail, by number of views, and the colour of each
+OVERVIEW_KINDS = { 2: b'-+', 3: b'otbc' }
+OVERVIEW_COLOURS = { 2: [ 'removed', 'added' ], 3: [ 'added', 'added', 'added', 'conflict' ] }
+
+# widest bar in the overview rail, in characters
+OVERVIEW_WIDTH = 24
+
+sbs_comparisons = {}
+class SbsComparison( object ):
+	# what an open comparison looks like right now, shared by both of its views
+	def __init__( self, views, result, colours, drawType, options, folds=None ):
+		self.views = views
+		self.colours = colours
+		self.drawType = drawType
+		self.options = options
+		
+		# current rows of both views and which side each row really belongs to
+		self.buffers = result.buffers()
+		self.kinds = result.row_kinds()
+		self.marks = result.row_marks()
+		if not self.kinds:
+			# an empty view still has one row
+			self.buffers = [ [ '' ] for view in views ]
+			self.kinds = bytearray( b' ' )
+			self.marks = bytearray( 1 )
+		
+		# live re-diffing only knows about two views
+		self.live = sbs_settings().get( 'live_diff', True ) and not sbs_settings().get( 'read_only', False ) and len( views ) == 2
+		self.dirty = {}
+		self.applying = False
+		self.changeCount = 0
+		self.realRows = [ [], [] ]
+		
+		# size of each view as of the last edit, to tell how much text an edit put in
+		self.sizes = [ view.size() for view in views ]
+		
+		# blocks that moved, see compare.moved_rows()
+		self.moves = [ list( move ) for move in result.moves ] if len( views ) == 2 else []
+		
+		# lines hidden behind each placeholder row in each view, in the same
+		# order as the views' sbs_folds regions
+		self.folds = [ fold[1:] for fold in folds or [] ]
+		
+		# first and last rows of each run of changed rows, rebuilt when the rows change
+		self.hunks = None
+		
+		# bucketed counts for the overview rail, same
+		self.overviewRows = None
+		
+		for view in views:
+			sbs_comparisons[view.id()] = self
+			
+	def close( self ):
+		for view in self.views:
+			if sbs_comparisons.get( view.id() ) is self:
+				del sbs_comparisons[view.id()]
+			
+	def side( self, view ):
+		for n, other in enumerate( self.views ):
+			if other.id() == view.id():
+				return n
+		return -1
+		
+	def on_modified( self, view ):
+		n = self.side( view )
+		grown = max( 0, view.size() - self.sizes[n] )
+		self.sizes[n] = view.size()
+		if not self.live or self.applying:
+			return
+		self.dirty[n] = True
+		
+		# remember where the edits were, sublime keeps the region in place as
+		# later edits shift the text around it. the cursor ends up after what was
+		# typed or pasted, so the region reaches back over the text that came in
+		edited = view.get_regions( 'sbs_live_edit' ) + [ view.line( sublime.Region( max( 0, sel.begin() - grown ), sel.end() ) ) for sel in view.sel() ]
+		begin = min( r.begin() for r in edited )
+		end = max( r.end() for r in edited )
+		view.add_regions( 'sbs_live_edit', [ sublime.Region( begin, end ) ], '', '', sublime.HIDDEN )
+		
+		# wait for typing to pause before re-diffing
+		self.changeCount += 1
+		changeCount = self.changeCount
+		sublime.set_timeout( lambda: self.refresh( changeCount ), 150 )
+		
+	def row_count( self, view ):
+		return view.rowcol( view.size() )[0] + 1
+		
+	def window_rows( self, view, start, end ):
+		# rows start to end (exclusive) of the view as it is now
+		stop = view.text_point( end - 1, 0 )
+		return view.substr( sublime.Region( view.text_point( start, 0 ), view.line( stop ).end() ) ).split( '\n' )
+		
+	def window_matches( self, start, end, deltas ):
+		# the rows either side of the window are still the ones we had, so
+		# nothing outside it was touched
+		for n, view in enumerate( self.views ):
+			if start > 0 and self.window_rows( view, start - 1, start ) != self.buffers[n][start - 1:start]:
+				return False
+			if end < len( self.kinds ) and self.window_rows( view, end + deltas[n], end + deltas[n] + 1 ) != self.buffers[n][end:end + 1]:
+				return False
+		return True
+		
+	def refresh( self, changeCount ):
+		if changeCount != self.changeCount or not self.dirty:
+			return
+		if any( view.window() is None for view in self.views ):
+			return
+		self.dirty = {}
+		
+		# the edited rows of both views, in old row numbers: rows before an edit
+		# are where they were, rows after it moved by the rows it added or removed
+		deltas = []
+		start = len( self.kinds )
+		end = 0
+		for n, view in enumerate( self.views ):
+			deltas.append( self.row_count( view ) - len( self.buffers[n] ) )
+			for edited in view.get_regions( 'sbs_live_edit' ):
+				first = view.rowcol( edited.begin() )[0]
+				start = min( start, first )
+				end = max( end, first + 1, min( view.rowcol( edited.end() )[0] - deltas[n] + 1, len( self.kinds ) ) )
+			view.erase_regions( 'sbs_live_edit' )
+		if start >= end:
+			return
+		
+		start, end = compare.edit_window( self.kinds, start, end, deltas, lambda start, end: self.window_matches( start, end, deltas ) )
+		
+		# re-diff the real lines of the window in both views
+		rows = [ self.window_rows( view, start, end + deltas[n] ) for n, view in enumerate( self.views ) ]
+		result, self.realRows = compare.rediff_window( [ buffer[start:end] for buffer in self.buffers ], self.kinds[start:end], rows, self.options )
+		self.apply( start, end, deltas, result )
+		
+	def apply( self, start, end, deltas, result ):
+		newBuffers = [ result.bufferA, result.bufferB ]
+		
+		self.applying = True
+		try:
+			for n, view in enumerate( self.views ):
+				col = 'AB'[n]
+				windowEnd = end + deltas[n]
+				rows = self.row_count( view )
+				begin = view.text_point( start, 0 )
+				stop = view.text_point( windowEnd, 0 ) - 1 if windowEnd < rows else view.size()
+				
+				# keep the cursor on the same real line
+				selection = [ ( view.rowcol( sel.a ), view.rowcol( sel.b ) ) for sel in view.sel() ]
+				
+				string = '\n'.join( newBuffers[n] )
+				fill_view( view, string, begin, stop )
+				newStop = begin + len( string )
+				
+				view.sel().clear()
+				for a, b in selection:
+					view.sel().add( sublime.Region( self.map_point( view, n, a, start, windowEnd, result ), self.map_point( view, n, b, start, windowEnd, result ) ) )
+				
+				# swap the window's regions for the new ones
+				lineRegions = [ sublime.Region( begin + a, begin + b ) for a, b in result.line_regions( col ) ]
+				subRegions = [ sublime.Region( begin + a, begin + b ) for a, b in result.intraline_regions( col ) ]
+				movedRegions = [ sublime.Region( begin + a, begin + b ) for a, b in result.moved_regions( col ) ]
+				colours = [ 'removed', 'modified_deletion' ] if n == 0 else [ 'added', 'modified_addition' ]
+				for key, regions, colour in [ ( 'diff_highlighted-' + col, lineRegions, colours[0] ), ( 'diff_intraline-' + col, subRegions, colours[1] ), ( 'diff_moved-' + col, movedRegions, 'moved' ) ]:
+					kept = [ r for r in view.get_regions( key ) if r.end() < begin or r.begin() > newStop ]
+					view.add_regions( key, kept + regions, self.colours[colour], '', self.drawType )
+				
+				self.buffers[n][start:end] = newBuffers[n]
+		finally:
+			self.applying = False
+			self.sizes = [ view.size() for view in self.views ]
+		
+		# moves in the window come from the new result, the rest only shift
+		delta = len( result.bufferA ) - ( end - start )
+		moves = []
+		for rowA, rowB, count in self.moves:
+			if start <= rowA < end or start <= rowB < end:
+				continue
+			moves.append( [ rowA + ( delta if rowA >= end else 0 ), rowB + ( delta if rowB >= end else 0 ), count ] )
+		moves.extend( [ rowA + start, rowB + start, count ] for rowA, rowB, count in result.moves )
+		self.moves = moves
+		
+		self.kinds[start:end] = result.row_kinds()
+		self.marks[start:end] = result.row_marks()
+		self.hunks = None
+		self.overviewRows = None
+		
+	def expand_fold( self, index ):
+		# swap a placeholder row for the lines it stands for, in both views
+		hidden = self.folds.pop( index )
+		row = None
+		
+		self.applying = True
+		try:
+			for n, view in enumerate( self.views ):
+				regions = view.get_regions( 'sbs_folds' )
+				fold = regions.pop( index )
+				view.add_regions( 'sbs_folds', regions, 'comment', '', sublime.DRAW_OUTLINED )
+				if row is None:
+					row = view.rowcol( fold.begin() )[0]
+				
+				readOnly = view.is_read_only()
+				view.set_read_only( False )
+				fill_view( view, '\n'.join( hidden[n] ), fold.begin(), fold.end() )
+				view.set_read_only( readOnly )
+				
+				self.buffers[n][row:row + 1] = hidden[n]
+		finally:
+			self.applying = False
+			self.sizes = [ view.size() for view in self.views ]
+		
+		self.kinds[row:row + 1] = bytearray( b' ' ) * len( hidden[0] )
+		for move in self.moves:
+			for side in range( 2 ):
+				if move[side] > row:
+					move[side] += len( hidden[0] ) - 1
+		self.marks[row:row + 1] = bytearray( len( hidden[0] ) )
+		self.hunks = None
+		self.overviewRows = None
+		
+	def export_rows( self ):
+		# copies of the rows with any folded lines put back, plus the intraline
+		# spans of each view as { row: [ ( start col, end col ) ] }
+		foldRows = [ self.views[0].rowcol( fold.begin() )[0] for fold in self.views[0].get_regions( 'sbs_folds' ) ]
+		buffers = [ [], [] ]
+		kinds = bytearray()
+		last = 0
+		
+		# rows each fold adds, summed up to and including it
+		extra = []
+		added = 0
+		for row, hidden in zip( foldRows, self.folds ):
+			for n in range( 2 ):
+				buffers[n].extend( self.buffers[n][last:row] )
+				buffers[n].extend( hidden[n] )
+			kinds.extend( self.kinds[last:row] )
+			kinds.extend( b' ' * len( hidden[0] ) )
+			added += len( hidden[0] ) - 1
+			extra.append( added )
+			last = row + 1
+		for n in range( 2 ):
+			buffers[n].extend( self.buffers[n][last:] )
+		kinds.extend( self.kinds[last:] )
+		
+		intra = [ {}, {} ]
+		for n, view in enumerate( self.views ):
+			for region in view.get_regions( 'diff_intraline-' + 'AB'[n] ):
+				row, col = view.rowcol( region.begin() )
+				fold = bisect.bisect_left( foldRows, row ) - 1
+				row += extra[fold] if fold >= 0 else 0
+				intra[n].setdefault( row, [] ).append( ( col, col + region.size() ) )
+		return buffers, kinds, intra
+		
+	def hunk_rows( self ):
+		if self.hunks is None:
+			self.hunks = compare.find_hunks( self.kinds )
+		return self.hunks
+		
+	def overview( self ):
+		if self.overviewRows is None:
+			counted = OVERVIEW_KINDS[len( self.views )]
+			self.overviewRows = compare.overview( self.kinds, self.marks, sbs_settings().get( 'overview_buckets', 40 ), counted )
+		return self.overviewRows
+		
+	def map_point( self, view, n, rowcol, start, windowEnd, result ):
+		row, col = rowcol
+		if row >= windowEnd:
+			row += len( result.bufferA ) - ( windowEnd - start )
+		elif row >= start:
+			# nth real row of the window before, nth real row of the window after
+			filler = ord( '+' ) if n == 0 else ord( '-' )
+			kinds = result.row_kinds()
+			realRows = [ r for r in range( len( kinds ) ) if kinds[r] != filler ]
+			index = min( bisect.bisect_right( self.realRows[n], row - start ) - 1, len( realRows ) - 1 )
+			row = start + ( realRows[index] if index >= 0 else 0 )
+		return view.text_point( row, col )
+		
+class SbsExpandFoldCommand( sublime_plugin.TextCommand ):
+	def run( self, edit, all = False ):
+		comparison = sbs_comparisons.get( self.view.id() )
+		if comparison is None or not comparison.folds:
+			return
+		
+		regions = self.view.get_regions( 'sbs_folds' )
+		if all:
+			# last to first so the indexes stay put
+			indexes = range( len( regions ) - 1, -1, -1 )
+		else:
+			lines = [ self.view.line( sel.begin() ) for sel in self.view.sel() ]
+			indexes = [ i for i, fold in reversed( list( enumerate( regions ) ) ) if any( line.contains( fold ) for line in lines ) ]
+		
+		if not indexes:
+			sublime.status_message( 'No folded lines under the cursor' )
+			return
+		for index in indexes:
+			comparison.expand_fold( index )
+		
+class SbsExportCommand( sublime_plugin.TextCommand ):
+	def run( self, edit, format = 'patch', path = None ):
+		# format is 'patch' for a unified diff or 'html' for a side by side page
+		comparison = sbs_comparisons.get( self.view.id() )
+		if comparison is None or len( comparison.views ) != 2:
+			return
+		
+		if path is None:
+			name = 'comparison.html' if format == 'html' else 'comparison.patch'
+			path = os.path.join( os.path.expanduser( '~' ), name )
+			view = self.view
+			self.view.window().show_input_panel( 'Export comparison to:', path, lambda path: view.run_command( 'sbs_export', { 'format': format, 'path': path } ), None, None )
+			return
+		
+		buffers, kinds, intra = comparison.export_rows()
+		names = [ view.name() or 'untitled' for view in comparison.views ]
+		context = sbs_settings().get( 'export_context_lines', 3 )
+		if format == 'html':
+			pieces = export.html_report( buffers[0], buffers[1], kinds, intra[0], intra[1], names[0], names[1], hex_colours(), context )
+		else:
+			pieces = export.unified_diff( buffers[0], buffers[1], kinds, names[0], names[1], 3 if context is None else context )
+		
+		# rendering and writing happen off the main thread, the rows are copies
+		def write():
+			try:
+				export.write_export( path, pieces )
+			except ( IOError, OSError ) as e:
+				# e is gone once the except block ends, the message is kept for the main thread
+				msg = 'Compare Error: %s' % e
+				print( msg )
+				sublime.set_timeout( lambda: sublime.status_message( msg ), 0 )
+				return
+			sublime.set_timeout( lambda: sublime.status_message( 'Comparison exported to %s' % path ), 0 )
+		
+		thread = threading.Thread( target=write )
+		thread.daemon = True
+		thread.start()
+		
+	def is_enabled( self, format = 'patch', path = None ):
+		comparison = sbs_comparisons.get( self.view.id() )
+		return comparison is not None and len( comparison.views ) == 2
+		
+class SbsOverviewCommand( sublime_plugin.TextCommand ):
+	def run( self, edit ):
+		# a rail of where the changes are, one line per bucket of rows, built from
+		# the comparison's cached counts. clicking a line jumps there
+		comparison = sbs_comparisons.get( self.view.id() )
+		if comparison is None:
+			return
+		
+		buckets = comparison.overview()
+		colours = hex_colours()
+		kindColours = [ colours[name] for name in OVERVIEW_COLOURS[len( comparison.views )] ]
+		
+		# bars are scaled to the busiest bucket
+		busiest = max( [ sum( bucket[2:] ) for bucket in buckets ] + [ 1 ] )
+		def bar( count, colour ):
+			if not count:
+				return ''
+			return '<span style="color: %s">%s</span>' % ( colour, '\u2588' * max( 1, count * OVERVIEW_WIDTH // busiest ) )
+		
+		lines = []
+		for bucket in buckets:
+			row = bucket[1] if bucket[1] >= 0 else bucket[0]
+			bars = ''.join( bar( count, colour ) for count, colour in zip( bucket[2:], kindColours + [ colours['modified_deletion'] ] ) )
+			lines.append( '<a href="%d">line %d</a> %s' % ( row, bucket[0] + 1, bars or '<span class="empty">\u00b7</span>' ) )
+		
+		content = '<body id="sbs-overview"><style>a { text-decoration: none; } .empty { color: #888; }</style>%s</body>' % '<br>'.join( lines )
+		view = self.view
+		def on_navigate( href ):
+			view.hide_popup()
+			point = view.text_point( int( href ), 0 )
+			view.sel().clear()
+			view.sel().add( sublime.Region( point ) )
+			view.show_at_center( point )
+		
+		height = view.viewport_extent()[1]
+		view.show_popup( content, 0, view.visible_region().begin(), 400, height, on_navigate )
+		
+	def is_enabled( self ):
+		return self.view.id() in sbs_comparisons
+		
+class SbsGotoMovedCommand( sublime_plugin.TextCommand ):
+	def run( self, edit ):
+		# from a line of a moved block to the same line where it went (or came from)
+		comparison = sbs_comparisons.get( self.view.id() )
+		if comparison is None or not comparison.moves:
+			return
+		
+		n = comparison.side( self.view )
+		row = self.view.rowcol( self.view.sel()[0].begin() )[0]
+		otherRow = compare.moved_rows( comparison.kinds, comparison.moves, 'AB'[n] ).get( row )
+		if otherRow is None:
+			sublime.status_message( 'Not on a moved line' )
+			return
+		
+		other = comparison.views[1 - n]
+		point = other.text_point( otherRow, 0 )
+		other.sel().clear()
+		other.sel().add( sublime.Region( point ) )
+		other.window().focus_view( other )
+		other.show_at_center( point )
+		
+	def is_enabled( self ):
+		comparison = sbs_comparisons.get( self.view.id() )
+		return comparison is not None and len( comparison.moves ) > 0
+		
+class SbsLiveDiffListener( sublime_plugin.EventListener ):
+	def on_modified( self, view ):
+		comparison = sbs_comparisons.get( view.id() )
+		if comparison is not None:
+			comparison.on_modified( view )
+			
+	def on_close( self, view ):
+		comparison = sbs_comparisons.get( view.id() )
+		if comparison is not None:
+			comparison.close()
+
+class SbsCompareCommand( sublime_plugin.TextCommand ):			
+	def get_view_contents( self, view ):
+		selection = sublime.Region( 0, view.size() )
+		content = view.substr( selection )
+		return content
+		
+	def get_drawtype( self ):
+		# fill highlighting (DRAW_NO_OUTLINE) only exists on ST3+
+		drawType = sublime.DRAW_OUTLINED
+		if int( sublime.version() ) >= 3000:
+			if not sbs_settings().get( 'outlines_only', False ):
+				drawType = sublime.DRAW_NO_OUTLINE
+		return drawType
+		
+	def highlight_lines( self, view, result, col ):
+		# full line diffs, offsets come straight from the diff pass
+		regionList = [ sublime.Region( start, end ) for start, end in result.line_regions( col ) ]
+		colour = self.colours['removed']
+		if col == 'B':
+			colour = self.colours['added']
+
+		drawType = self.get_drawtype()			
+		view.add_regions( 'diff_highlighted-' + col, regionList, colour, '', drawType )
+		
+	def moved_lines( self, view, result, col ):
+		# lines of blocks that only moved, drawn instead of the removed/added colour
+		regionList = [ sublime.Region( start, end ) for start, end in result.moved_regions( col ) ]
+		view.add_regions( 'diff_moved-' + col, regionList, self.colours['moved'], '', self.get_drawtype() )
+		
+	def sub_highlight_lines( self, view, result, col ):
+		# intra-line diffs
+		regionList = [ sublime.Region( start, end ) for start, end in result.intraline_regions( col ) ]
+		
+		colour = self.colours['modified_deletion']
+		if col == 'B':
+			colour = self.colours['modified_addition']
+			
+		drawType = self.get_drawtype()			
+		view.add_regions( 'diff_intraline-' + col, regionList, colour, '', drawType )
+				
+		
+	def compare_views( self, views, contents, on_done=None, runStats=None, files=None ):
+		# two views, or base, ours and theirs, still empty: each one gets filled
+		# once with its padded rows when the result is in. with files, contents
+		# is None and the job reads them itself
+		if runStats is None:
+			runStats = stats.CompareStats( 'views', False )
+		
+		def apply_result( result ):
+			if len( views ) == 3:
+				self.show_merge_result( views, result, runStats )
+			else:
+				self.show_result( views[0], views[1], result, runStats )
+			if on_done is not None:
+				on_done()
+			sbs_stats.add( runStats )
+		
+		job = SbsCompareJob( views, contents, apply_result, runStats, self.options, files )
+		job.start()
+		
+	def precheck_files( self, files, runStats, on_compare ):
+		# identical files, and binary ones unless they're shown as hex dumps, get a
+		# message and no window. that means reading them, so it happens off the main
+		# thread and on_compare is called back on it if there's a comparison to show
+		hexDump = sbs_settings().get( 'binary_hex_dump', True )
+		
+		def check():
+			message = None
+			try:
+				with runStats.stage( 'precheck' ):
+					if fileio.same_contents( files[0], files[1] ):
+						message = 'The files are identical:\n%s\n%s' % ( files[0], files[1] )
+					elif not hexDump and any( fileio.is_binary( path ) for path in files ):
+						message = 'Binary files differ:\n%s\n%s' % ( files[0], files[1] )
+			except ( IOError, OSError ) as e:
+				# e is gone once the except block ends, the message is kept for the main thread
+				msg = 'Compare Error: %s' % e
+				print( msg )
+				sublime.set_timeout( lambda: sublime.status_message( msg ), 0 )
+				return
+			
+			def done():
+				if message is None:
+					on_compare()
+				else:
+					sbs_stats.add( runStats )
+					sublime.message_dialog( message )
+			sublime.set_timeout( done, 0 )
+		
+		thread = threading.Thread( target=check )
+		thread.daemon = True
+		thread.start()
+		
+	def show_result( self, view1, view2, result, runStats ):
+		# context only: long unchanged stretches become placeholder rows
+		folds = []
+		if sbs_settings().get( 'context_only', False ):
+			with runStats.stage( 'collapse' ):
+				result, folds = compare.collapse( result, sbs_settings().get( 'context_lines', 3 ) )
+		
+		highlightA = result.highlightA
+		highlightB = result.highlightB
+		subHighlightA = result.subHighlightA
+		subHighlightB = result.subHighlightB
+		
+		with runStats.stage( 'fill_views' ):
+			fill_view( view1, compare.join_pieces( result.bufferA ) )
+			fill_view( view2, compare.join_pieces( result.bufferB ) )
+		
+		with runStats.stage( 'add_regions' ):
+			self.highlight_lines( view1, result, 'A' )
+			self.highlight_lines( view2, result, 'B' )
+			self.moved_lines( view1, result, 'A' )
+			self.moved_lines( view2, result, 'B' )
+			
+			if sbs_settings().get( 'enable_intraline', True ):
+				self.sub_highlight_lines( view1, result, 'A' )
+				self.sub_highlight_lines( view2, result, 'B' )
+		
+		intraDiff = ''
+		if sbs_settings().get( 'enable_intraline', True ):
+			numIntra = len( subHighlightA ) + len( subHighlightB )
+			intraDiff =  str( numIntra ) + ' intra-line modifications\n'
+		
+		if folds:
+			for view in [ view1, view2 ]:
+				foldRegions = [ view.line( view.text_point( fold[0], 0 ) ) for fold in folds ]
+				view.add_regions( 'sbs_folds', foldRegions, 'comment', '', sublime.DRAW_OUTLINED )
+		
+		SbsComparison( [ view1, view2 ], result, self.colours, self.get_drawtype(), self.options, folds )
+		
+		if sbs_settings().get( 'line_count_popup', False ):
+			numDiffs = len( highlightA ) + len( highlightB )
+			movedDiff = ''
+			if result.moves:
+				movedDiff = str( sum( move[2] for move in result.moves ) ) + ' lines moved\n'
+			sublime.message_dialog( intraDiff + movedDiff + str( len( highlightA ) ) + ' lines removed, ' + str( len( highlightB ) ) + ' lines added\n' + str( numDiffs ) + ' line differences total' )
+			
+	def show_merge_result( self, views, result, runStats ):
+		drawType = self.get_drawtype()
+		
+		with runStats.stage( 'fill_views' ):
+			for view, buffer in zip( views, result.buffers() ):
+				fill_view( view, compare.join_pieces( buffer ) )
+			
+		with runStats.stage( 'add_regions' ):
+			for n, view in enumerate( views ):
+				# the base shows what was taken out, ours and theirs what was put in
+				colour = self.colours['removed'] if n == 0 else self.colours['added']
+				view.add_regions( 'diff_highlighted-' + merge.VIEW_NAMES[n], [ sublime.Region( start, end ) for start, end in result.changed[n] ], colour, '', drawType )
+				view.add_regions( 'diff_conflict-' + merge.VIEW_NAMES[n], [ sublime.Region( start, end ) for start, end in result.conflicts[n] ], self.colours['conflict'], '', drawType )
+		
+		SbsComparison( views, result, self.colours, drawType, self.options )
+		
+		if sbs_settings().get( 'line_count_popup', False ):
+			counts = result.counts
+			sublime.message_dialog( '%d changes in ours only, %d in theirs only\n%d made on both sides\n%d conflicts' % ( counts['o'], counts['t'], counts['b'], counts['c'] ) )
+
+		
+	def run( self, edit, with_active = False, group = -1, index = -1, compare_selections = False ):		
+		global sbs_markedSelection
+		
+		# timings for this comparison, only kept when collect_stats is on
+		runStats = stats.CompareStats( 'views', sbs_settings().get( 'collect_stats', False ) )
+		self.options = compare.read_options( sbs_settings() )
+		
+		active_view = self.view
+		active_window = active_view.window()
+		active_id = active_view.id()
+		
+		openTabs = []
+		
+		for view in active_window.views():
+			if view.id() != active_id:
+				viewName = 'untitled'
+				if view.file_name():
+					viewName = view.file_name()
+				elif view.name():
+					viewName = view.name()
+				openTabs.append( [ viewName, view ] )
+
+		def create_comparison( view1_contents, view2_contents, syntax, name1_override = False, name2_override = False, base = None, files = None ):
+			# base, if given, is ( contents, name ) of the common ancestor for a
+			# three-way comparison, shown left of the other two. files, if given,
+			# are read by the comparison job and the contents are None
+			view1_syntax = syntax
+			view2_syntax = syntax
+			
+			# make new window
+			active_window.run_command( 'new_window' )		
+			new_window = sublime.active_window()
+			if base is None:
+				new_window.set_layout( { "cols": [0.0, 0.5, 1.0], "rows": [0.0, 1.0], "cells": [[0, 0, 1, 1], [1, 0, 2, 1]] } )
+			else:
+				new_window.set_layout( { "cols": [0.0, 0.33, 0.67, 1.0], "rows": [0.0, 1.0], "cells": [[0, 0, 1, 1], [1, 0, 2, 1], [2, 0, 3, 1]] } )
+			
+			if sbs_settings().get( 'toggle_sidebar', False ):
+				new_window.run_command( 'toggle_side_bar' )
+			if sbs_settings().get( 'toggle_menu', False ):
+				new_window.run_command( 'toggle_menu' )
+			
+			views = []
+			
+			# base view
+			if base is not None:
+				new_window.run_command( 'new_file' )
+				new_window.active_view().set_syntax_file( syntax )
+				new_window.active_view().set_name( os.path.basename( base[1] ) + ' (base)' )
+				new_window.active_view().set_scratch( True )
+				views.append( new_window.active_view() )
+			
+			# view 1
+			new_window.run_command( 'new_file' )
+			new_window.active_view().set_syntax_file( view1_syntax )
+			
+			view1_name = 'untitled'
+			if active_view.file_name():
+				view1_name = active_view.file_name()
+			elif active_view.name():
+				view1_name = active_view.name()
+			if name1_override != False:
+				view1_name = name1_override
+			new_window.active_view().set_name( os.path.basename( view1_name ) + ( ' (active)' if base is None else ' (ours)' ) )
+			
+			# move view 1 to group 2 when there's a base
+			if base is not None:
+				new_window.set_view_index( new_window.active_view(), 1, 0 )
+				
+			new_window.active_view().set_scratch( True )	
+			view1 = new_window.active_view()
+			views.append( view1 )
+			
+			# view 2
+			new_window.run_command( 'new_file' )
+			new_window.active_view().set_syntax_file( view2_syntax )
+			new_window.active_view().set_name( os.path.basename( name2_override ) + ( ' (other)' if base is None else ' (theirs)' ) )
+			
+			# move view 2 to the last group
+			new_window.set_view_index( new_window.active_view(), len( views ), 0 )
+			
+			new_window.active_view().set_scratch( True )
+			view2 = new_window.active_view()
+			views.append( view2 )
+			
+			register_comparison( new_window, views )
+			for view in views:
+				# keep track of these views			
+				view.settings().set( "is_sbs_compare", True )
+			
+				# disable word wrap
+				view.settings().set( 'word_wrap', 'false' )
+			
+			# generate and set colour scheme
+			with runStats.stage( 'generate_colour_scheme' ):
+				self.colours = generate_colour_scheme( views[0] )
+				for view in views[1:]:
+					generate_colour_scheme( view, generate=False )
+			
+			# run diff, the rest happens once it's done
+			def after_compare():
+				# make readonly
+				for view in views:
+					new_window.focus_view( view )
+					if sbs_settings().get( 'read_only', False ):
+						new_window.active_view().set_read_only( True )
+				
+				# activate scroll syncer				
+				ViewScrollSyncer( new_window, views )
+				
+				for view in views:
+					# move views to top left
+					view.set_viewport_position( (0, 0), False )
+				
+					# move cursors to top left
+					origin = view.text_point( 0, 0 )
+					
+					view.sel().clear()
+					view.sel().add( sublime.Region( origin ) )
+					view.show( origin )
+				
+				# focus first view
+				new_window.focus_view( view1 )
+				
+			contents = None
+			if files is None:
+				contents = [ view1_contents, view2_contents ] if base is None else [ base[0], view1_contents, view2_contents ]
+			self.compare_views( views, contents, after_compare, runStats, files )
+
+		def on_click( index ):
+			if index > -1:
+				# get original views' data
+				with runStats.stage( 'get_view_contents' ):
+					view1_contents = self.get_view_contents( active_view )
+					view2_contents = self.get_view_contents( openTabs[index][1] )
+				
+				syntax = active_view.settings().get( 'syntax' )
+				
+				create_comparison( view1_contents, view2_contents, syntax, False, openTabs[index][0] )
+				
+		if len( sbs_files ) > 0:
+			file1, file2, baseFile = sbs_files.popleft()
+			
+			# straight from disk, no throwaway views. the job reads them once the
+			# window is open, two files are checked before there's a window at all
+			runStats.source = 'files'
+			syntax = syntax_for_file( file1, active_view.settings().get( 'syntax' ) )
+			if baseFile is None:
+				files = [ file1, file2 ]
+				self.precheck_files( files, runStats, lambda: create_comparison( None, None, syntax, file1, file2, None, files ) )
+			else:
+				create_comparison( None, None, syntax, file1, file2, ( None, baseFile ), [ baseFile, file1, file2 ] )
+		elif compare_selections == True:
+			runStats.source = 'selections'
+			selA = sbs_markedSelection[0]
+			selB = sbs_markedSelection[1]
+			
+			sel = active_view.sel()
+			
+			selNum = 0
+			for selection in sel:
+				selNum += 1
+			
+			if selNum == 2:
+				with runStats.stage( 'get_view_contents' ):
+					selA = active_view.substr( sel[0] )
+					selB = active_view.substr( sel[1] )
+			
+			syntax = active_view.settings().get( 'syntax' )
+			create_comparison( selA, selB, syntax, 'selection A', 'selection B' )
+		elif len( openTabs ) == 1:
+			on_click( 0 )
+		else:
+			if with_active == True:
+				active_group, active_group_index = active_window.get_view_index( active_view )
+				
+				if group == -1 and index == -1:
+					group = 0 if active_group == 1 else 1
+					other_active_view = active_window.active_view_in_group( group )
+					index = active_window.get_view_index( other_active_view )[1]
+				
+				if index > active_group_index:
+					index -= 1
+					
+				if group > active_group:
+					index += len( active_window.views_in_group( active_group ) ) - 1
+				elif group < active_group:
+					index += 1
+					
+				on_click( index )	
+			else:
+				menu_items = []
+				for tab in openTabs:
+					fileName = tab[0]
+					if sbs_settings().get( 'expanded_filenames', False ):
+						menu_items.append( [ os.path.basename( fileName ), fileName ] )
+					else:
+						menu_items.append( os.path.basename( fileName ) )	
+				sublime.set_timeout( self.view.window().show_quick_panel( menu_items, on_click ) )
+
+
+sbs_syncers = {}
+class ViewScrollSyncer( object ):
+	# sublime has no scroll event, so view events start a short burst of fast
+	# checks that winds down to a slow idle check while the window has focus,
+	# and stops completely when it doesn't
+	def __init__( self, window, viewList ):
+		self.window = window
+		self.views = viewList
+		self.timeout_focused = 10
+		self.timeout_idle = 100
+		self.burst_ticks = 30
+		
+		self.lastPosition = viewList[0].viewport_position()
+		self.idleTicks = 0
+		self.scheduled = False
+		self.closed = False
+		
+		for view in viewList:
+			sbs_syncers[view.id()] = self
+		
+		self.poke()
+		
+	def close( self ):
+		self.closed = True
+		for view in self.views:
+			if sbs_syncers.get( view.id() ) is self:
+				del sbs_syncers[view.id()]
+		
+	def poke( self ):
+		# something happened in one of the views, watch closely for a while
+		self.idleTicks = 0
+		self.schedule( self.timeout_focused )
+		
+	def schedule( self, timeout ):
+		if self.scheduled or self.closed:
+			return
+		self.scheduled = True
+		sublime.set_timeout( self.run, timeout )
+		
+	def update_scroll( self, source ):
+		for view in self.views:
+			if view.id() != source.id():
+				view.set_viewport_position( self.lastPosition, False )
+		
+	def run( self ):
+		self.scheduled = False
+		if self.closed:
+			return
+		
+		win = sublime.active_window()
+		if win is None or win.id() != self.window.id():
+			# on_activated picks things back up
+			return
+		
+		source = None
+		for view in self.views:
+			pos = view.viewport_position()
+			if pos != self.lastPosition:
+				source = view
+				newPosition = pos
+				
+		if source is not None:
+			self.lastPosition = newPosition
+			self.update_scroll( source )
+			self.idleTicks = 0
+		else:
+			self.idleTicks += 1
+		
+		if self.idleTicks < self.burst_ticks:
+			self.schedule( self.timeout_focused )
+		else:
+			self.schedule( self.timeout_idle )
+
+class SbsScrollSyncListener( sublime_plugin.EventListener ):
+	def poke( self, view ):
+		syncer = sbs_syncers.get( view.id() )
+		if syncer is not None:
+			syncer.poke()
+	
+	def on_activated( self, view ):
+		self.poke( view )
+		
+	def on_selection_modified( self, view ):
+		self.poke( view )
+		
+	def on_post_text_command( self, view, command_name, args ):
+		self.poke( view )
+		
+	def on_close( self, view ):
+		syncer = sbs_syncers.get( view.id() )
+		if syncer is not None:
+			syncer.close()
+
+					
+def sbs_scroll_to( view, prev=False ):
+	comparison = sbs_comparisons.get( view.id() )
+	if comparison is None:
+		return
+	
+	# hunks are row ranges, the same in both views
+	starts, ends = comparison.hunk_rows()
+	current_row = view.rowcol( view.sel()[0].begin() )[0]
+	if prev:
+		index = bisect.bisect_left( starts, current_row ) - 1
+	else:
+		index = bisect.bisect_right( starts, current_row )
+	
+	if 0 <= index < len( starts ):
+		for other in comparison.views:
+			highlight = other.text_point( starts[index], 0 )
+			other.sel().clear()
+			other.sel().add( sublime.Region( highlight ) )
+		
+		highlight = view.text_point( starts[index], 0 )
+		hunk = sublime.Region( highlight, view.text_point( ends[index], 0 ) )
+		view.show( hunk )
+		
+		def align():
+			# sometimes necessary, better safe than sorry
+			view.show( hunk )
+			for other in comparison.views:
+				if other.id() != view.id():
+					other.set_viewport_position( view.viewport_position(), False )
+		sublime.set_timeout( align, 10 )
+		return
+				
+	msg = 'Reached the '
+	msg += 'beginning' if prev else 'end'
+	view.window().show_quick_panel( [ msg ], None )		
+					
+class SbsPrevDiffCommand( sublime_plugin.TextCommand ):
+	def run( self, edit, string='' ):
+		sbs_scroll_to( self.view, prev=True )
+					
+class SbsNextDiffCommand( sublime_plugin.TextCommand ):
+	def run( self, edit, string='' ):
+		sbs_scroll_to( self.view )
@@ -0,0 +1 @@
+# headless comparison core - nothing in this package may import sublime
@@ -0,0 +1,141 @@
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from . import compare
+from . import fileio
+
+
+# pairs diffed at once in a batch comparison
+BATCH_WORKERS = 4
+
+STATUSES = [ 'different', 'error', 'same' ]
+
+
+def read_manifest( path ):
+	# a JSON list of [ A, B ] pairs or { "A": ..., "B": ... } objects, or plain text
+	# with one tab separated pair per line ('#' starts a comment line).
+	# relative paths are taken from the manifest's folder
+	folder = os.path.dirname( os.path.abspath( path ) )
+	with open( path, 'r', encoding='utf-8' ) as f:
+		text = f.read()
+
+	if text.lstrip().startswith( '[' ):
+		entries = json.loads( text )
+	else:
+		entries = [ [ part.strip() for part in line.split( '\t' ) ] for line in text.splitlines() if line.strip() and not line.lstrip().startswith( '#' ) ]
+
+	pairs = []
+	for entry in entries:
+		if isinstance( entry, dict ):
+			entry = [ entry.get( 'A' ), entry.get( 'B' ) ]
+		if len( entry ) != 2 or not all( entry ):
+			raise ValueError( 'bad manifest entry: %r' % ( entry, ) )
+		pairs.append( ( os.path.join( folder, entry[0] ), os.path.join( folder, entry[1] ) ) )
+	return pairs
+
+
+def hunk_ranges( kinds ):
+	# [ start, count ] in A and B for each hunk of row_kinds(), numbered like
+	# a unified diff header (an empty side starts at the line before it)
+	starts, ends = compare.find_hunks( kinds )
+	ranges = []
+	lineA = lineB = 0
+	last = 0
+	for start, end in zip( starts, ends ):
+		# everything between hunks is on both sides
+		lineA += start - last
+		lineB += start - last
+		hunk = kinds[start:end + 1]
+		removed = hunk.count( b'-' )
+		added = hunk.count( b'+' )
+		ranges.append( [ lineA + ( 1 if removed else 0 ), removed, lineB + ( 1 if added else 0 ), added ] )
+		lineA += removed
+		lineB += added
+		last = end + 1
+	return ranges
+
+
+def compare_pair( pathA, pathB, options=None, fallback_encodings=None ):
+	# report entry for one pair, an unreadable file is reported rather than raised
+	entry = { 'A': pathA, 'B': pathB, 'removed': 0, 'added': 0, 'intraline': 0, 'hunks': [] }
+	try:
+		if fileio.same_contents( pathA, pathB ):
+			entry['status'] = 'same'
+			return entry
+
+		if fileio.is_binary( pathA ) or fileio.is_binary( pathB ):
+			# hex dump rows, numbered in rows of fileio.HEX_WIDTH bytes
+			options = compare.read_options( options )
+			options['ignore_patterns'] = options['ignore_patterns'] + [ fileio.HEX_OFFSET_PATTERN ]
+			linesA = list( fileio.hex_lines( pathA ) )
+			linesB = list( fileio.hex_lines( pathB ) )
+			entry['binary'] = True
+		else:
+			linesA = fileio.read_text( pathA, fallback_encodings )[0].splitlines( False )
+			linesB = fileio.read_text( pathB, fallback_encodings )[0].splitlines( False )
+	except ( IOError, OSError ) as e:
+		entry['status'] = 'error'
+		entry['error'] = str( e )
+		return entry
+
+	if linesA != linesB:
+		result = compare.compare_lines( linesA, linesB, options )
+		entry['removed'] = len( result.highlightA )
+		entry['added'] = len( result.highlightB )
+		entry['intraline'] = len( result.subHighlightA ) + len( result.subHighlightB )
+		entry['hunks'] = hunk_ranges( result.row_kinds() )
+
+	# the ignore options can make different texts compare the same
+	entry['status'] = 'different' if entry['hunks'] else 'same'
+	return entry
+
+
+def compare_batch( pairs, options=None, fallback_encodings=None, workers=BATCH_WORKERS, progress=None ):
+	# report entries for ( A, B ) pairs, in the same order.
+	# progress, if given, is called as progress( 'compare', done, total ) and may
+	# raise compare.CompareCancelled to stop the batch
+	options = compare.read_options( options )
+	entries = []
+	with ThreadPoolExecutor( max_workers=max( 1, workers ) ) as pool:
+		futures = [ pool.submit( compare_pair, pathA, pathB, options, fallback_encodings ) for pathA, pathB in pairs ]
+		try:
+			for done, future in enumerate( futures, 1 ):
+				entries.append( future.result() )
+				if progress is not None:
+					progress( 'compare', done, len( futures ) )
+		except compare.CompareCancelled:
+			for future in futures:
+				future.cancel()
+			raise
+	return entries
+
+
+def format_report( entries ):
+	counts = dict( ( status, 0 ) for status in STATUSES )
+	for entry in entries:
+		counts[entry['status']] += 1
+
+	lines = [ '%d pairs: %d different, %d same, %d errors' % ( len( entries ), counts['different'], counts['same'], counts['error'] ) ]
+	for entry in entries:
+		lines.append( '' )
+		lines.append( '[%s] %s -> %s%s' % ( entry['status'], entry['A'], entry['B'], ' (binary, hunks in rows of %d bytes)' % fileio.HEX_WIDTH if entry.get( 'binary' ) else '' ) )
+		if entry['status'] == 'error':
+			lines.append( '    %s' % entry['error'] )
+		elif entry['status'] == 'different':
+			lines.append( '    %d removed, %d added, %d intraline' % ( entry['removed'], entry['added'], entry['intraline'] ) )
+			for startA, countA, startB, countB in entry['hunks']:
+				lines.append( '    @@ -%d,%d +%d,%d @@' % ( startA, countA, startB, countB ) )
+	return '\n'.join( lines ) + '\n'
+
+
+def write_report( path, entries ):
+	# JSON for a .json path, plain text otherwise
+	folder = os.path.dirname( path )
+	if folder and not os.path.exists( folder ):
+		os.makedirs( folder )
+	with open( path, 'w', encoding='utf-8' ) as f:
+		if path.lower().endswith( '.json' ):
+			f.write( json.dumps( { 'pairs': entries }, indent=4, sort_keys=True ) )
+		else:
+			f.write( format_report( entries ) )
@@ -0,0 +1,161 @@
+import os
+import json
+import hashlib
+import threading
+import collections
+
+from . import compare
+
+
+# bump when the packed format changes so old disk entries are ignored
+CACHE_VERSION = 3
+
+
+def cache_key( texts, options ):
+	# hash of everything a comparison depends on. a text can also be a list of
+	# lines, hashed the same as the lines joined up without joining them
+	key = hashlib.sha1()
+	key.update( str( CACHE_VERSION ).encode( 'ascii' ) )
+	for text in texts:
+		if isinstance( text, str ):
+			digest = hashlib.sha1( text.encode( 'utf-8', 'surrogatepass' ) )
+		else:
+			digest = hashlib.sha1()
+			for n, line in enumerate( text ):
+				if n:
+					digest.update( b'\n' )
+				digest.update( line.encode( 'utf-8', 'surrogatepass' ) )
+		key.update( digest.digest() )
+	options = compare.read_options( options )
+	key.update( json.dumps( options, sort_keys=True ).encode( 'utf-8' ) )
+	return key.hexdigest()
+
+
+def pack( result ):
+	# the row layout as runs of row kinds plus the flat intraline spans,
+	# the lines themselves come back from the inputs
+	runs = []
+	for kind in result.row_kinds():
+		kind = chr( kind )
+		if runs and runs[-1][0] == kind:
+			runs[-1][1] += 1
+		else:
+			runs.append( [ kind, 1 ] )
+	return json.dumps( { 'runs': runs, 'intraA': result.subHighlightA.values.tolist(), 'intraB': result.subHighlightB.values.tolist(), 'moves': result.moves }, separators=( ',', ':' ) )
+
+
+def unpack( packed, linesA, linesB ):
+	# rebuild a CompareResult without diffing anything
+	packed = json.loads( packed )
+	result = compare.CompareResult()
+	i = j = 0
+	posA = posB = 0
+	for kind, count in packed['runs']:
+		if kind == ' ':
+			# the same rows on both sides, not always the same text (ignore options)
+			result.bufferA.extend( linesA[i:i + count] )
+			result.bufferB.extend( linesB[j:j + count] )
+			posA += sum( len( line ) for line in linesA[i:i + count] ) + count
+			posB += sum( len( line ) for line in linesB[j:j + count] ) + count
+			i += count
+			j += count
+			continue
+		for n in range( count ):
+			row = len( result.bufferA )
+			if kind == '-':
+				result.bufferA.append( linesA[i] )
+				result.bufferB.append( '' )
+				result.highlightA.append( row )
+				result.highlightStartsA.append( posA )
+				posA += len( linesA[i] ) + 1
+				posB += 1
+				i += 1
+			else:
+				result.bufferA.append( '' )
+				result.bufferB.append( linesB[j] )
+				result.highlightB.append( row )
+				result.highlightStartsB.append( posB )
+				posA += 1
+				posB += len( linesB[j] ) + 1
+				j += 1
+
+	result.subHighlightA.values.fromlist( packed['intraA'] )
+	result.subHighlightB.values.fromlist( packed['intraB'] )
+	result.moves = packed['moves']
+	return result
+
+
+class ResultCache( object ):
+	# packed results by key, least recently used dropped first once past maxBytes.
+	# folder, if given, keeps a copy of every entry on disk, trimmed to maxDiskBytes
+	def __init__( self, maxBytes, folder=None, maxDiskBytes=0 ):
+		self.maxBytes = maxBytes
+		self.folder = folder
+		self.maxDiskBytes = maxDiskBytes
+		self.entries = collections.OrderedDict()
+		self.size = 0
+		self.lock = threading.Lock()
+
+	def disk_path( self, key ):
+		return os.path.join( self.folder, key + '.json' )
+
+	def get( self, key ):
+		with self.lock:
+			packed = self.entries.pop( key, None )
+			if packed is not None:
+				self.entries[key] = packed
+				return packed
+
+		if self.folder is None:
+			return None
+		try:
+			with open( self.disk_path( key ), 'r', encoding='utf-8' ) as f:
+				packed = f.read()
+			# eviction goes by modified time, so reading counts as a use
+			os.utime( self.disk_path( key ), None )
+		except ( IOError, OSError ):
+			return None
+		self.remember( key, packed )
+		return packed
+
+	def remember( self, key, packed ):
+		with self.lock:
+			if key in self.entries:
+				self.size -= len( self.entries.pop( key ) )
+			if len( packed ) > self.maxBytes:
+				return
+			self.entries[key] = packed
+			self.size += len( packed )
+			while self.size > self.maxBytes:
+				self.size -= len( self.entries.popitem( last=False )[1] )
+
+	def put( self, key, packed ):
+		self.remember( key, packed )
+		if self.folder is None:
+			return
+		try:
+			if not os.path.exists( self.folder ):
+				os.makedirs( self.folder )
+			with open( self.disk_path( key ), 'w', encoding='utf-8' ) as f:
+				f.write( packed )
+			self.trim_disk()
+		except ( IOError, OSError ) as e:
+			print( 'Compare Error: couldn\'t write to the result cache: %s' % e )
+
+	def trim_disk( self ):
+		files = []
+		total = 0
+		for name in os.listdir( self.folder ):
+			if not name.endswith( '.json' ):
+				continue
+			stat = os.stat( os.path.join( self.folder, name ) )
+			files.append( ( stat.st_mtime, stat.st_size, name ) )
+			total += stat.st_size
+
+		# oldest first
+		files.sort()
+		for mtime, size, name in files:
+			if total <= self.maxDiskBytes:
+				break
+			os.remove( os.path.join( self.folder, name ) )
+			total -= size
@@ -0,0 +1,618 @@
+import re
+import time
+import array
+import bisect
+
+from . import linediff
+from . import intraline
+
+
+# settings the comparison depends on, with their defaults
+DEFAULT_OPTIONS = {
+	'diff_algorithm': linediff.DEFAULT_ALGORITHM,
+	'enable_intraline': True,
+	'intraline_emptyspace': False,
+	'intraline_granularity': 'token',
+	'intraline_max_line_length': 20000,
+	'intraline_refine_length': 32,
+	'ignore_whitespace': False,
+	'ignore_case': False,
+	'ignore_patterns': [],
+	'detect_moves': True,
+}
+
+def read_options( settings=None ):
+	# settings can be anything with a .get( key, default ), including sublime settings
+	options = {}
+	for key in DEFAULT_OPTIONS:
+		value = DEFAULT_OPTIONS[key]
+		if settings is not None:
+			value = settings.get( key, value )
+		options[key] = value
+	return options
+
+
+def line_keys( lines, options ):
+	# what each line is compared by: with any of the ignore options on, a
+	# normalised copy made once per line, otherwise the lines themselves
+	patterns = [ re.compile( pattern ) for pattern in options['ignore_patterns'] ]
+	ignoreWhitespace = options['ignore_whitespace']
+	ignoreCase = options['ignore_case']
+	if not patterns and not ignoreWhitespace and not ignoreCase:
+		return lines
+
+	keys = []
+	for line in lines:
+		# masked parts (timestamps, ids) all compare equal to each other
+		for pattern in patterns:
+			line = pattern.sub( '\0', line )
+		if ignoreWhitespace:
+			line = ' '.join( line.split() )
+		if ignoreCase:
+			line = line.casefold()
+		keys.append( line )
+	return keys
+
+
+# rows handled between progress callbacks
+PROGRESS_ROWS = 2000
+
+# smallest block of lines that counts as moved, and the least non-space
+# characters in it so runs of braces and blank lines don't
+MOVE_MIN_LINES = 3
+MOVE_MIN_CHARS = 16
+
+# places a block of lines is looked for, repeated boilerplate stops there
+MOVE_MAX_CANDIDATES = 16
+
+
+class CompareCancelled( Exception ):
+	# raised from a progress callback to abandon a comparison
+	pass
+
+
+class Spans( object ):
+	# intraline spans as ( row, start col, end col ), kept flat in one array
+	# rather than a list per span
+	def __init__( self, spans=() ):
+		self.values = array.array( 'l' )
+		for row, start, end in spans:
+			self.append( row, start, end )
+
+	def append( self, row, start, end ):
+		self.values.extend( ( row, start, end ) )
+
+	def rows( self ):
+		return self.values[::3]
+
+	def __len__( self ):
+		return len( self.values ) // 3
+
+	def __iter__( self ):
+		values = self.values
+		for n in range( 0, len( values ), 3 ):
+			yield values[n], values[n + 1], values[n + 2]
+
+
+class CompareResult( object ):
+	def __init__( self ):
+		# padded output, one entry per row in the comparison views
+		self.bufferA = []
+		self.bufferB = []
+
+		# rows with removed/added lines
+		self.highlightA = array.array( 'l' )
+		self.highlightB = array.array( 'l' )
+
+		# character offset of each highlighted row, parallel to highlightA/B
+		self.highlightStartsA = array.array( 'l' )
+		self.highlightStartsB = array.array( 'l' )
+
+		# intraline spans of the highlighted rows, in row order
+		self.subHighlightA = Spans()
+		self.subHighlightB = Spans()
+
+		# blocks removed in one place and added in another, as [ first row in A,
+		# first row in B, lines ], see moved_rows(). their rows are still in highlightA/B
+		self.moves = []
+
+		# time spent on intraline diffing, the rest of the comparison is the line diff
+		self.intralineSeconds = 0.0
+
+	def side( self, col ):
+		if col == 'A':
+			return self.highlightA, self.highlightStartsA, self.bufferA, self.subHighlightA
+		return self.highlightB, self.highlightStartsB, self.bufferB, self.subHighlightB
+
+	def row_spans( self, col ):
+		# ( row, offset of the row, start col, end col ) for each intraline span,
+		# found by walking the highlighted rows alongside, both are in row order
+		rows, starts, buffer, spans = self.side( col )
+		n = 0
+		for row, start, end in spans:
+			while rows[n] != row:
+				n += 1
+			yield row, starts[n], start, end
+
+	def line_regions( self, col ):
+		# ( start, end ) offsets of the changed rows with their intraline spans cut out,
+		# built in one pass without going back to the view
+		rows, starts, buffer = self.side( col )[:3]
+		moved = self.moved_rows( col )
+		spans = self.row_spans( col )
+		span = next( spans, None )
+		regions = []
+		for row, lineStart in zip( rows, starts ):
+			lineEnd = lineStart + len( buffer[row] )
+			pieces = []
+			while span is not None and span[0] == row:
+				pieces.append( ( lineStart, span[1] + span[2] ) )
+				lineStart = span[1] + span[3]
+				span = next( spans, None )
+			if row not in moved:
+				regions.extend( pieces )
+				regions.append( ( lineStart, lineEnd ) )
+		return regions
+
+	def moved_rows( self, col ):
+		return moved_rows( self.row_kinds(), self.moves, col )
+
+	def moved_regions( self, col ):
+		rows, starts, buffer = self.side( col )[:3]
+		moved = self.moved_rows( col )
+		return [ ( start, start + len( buffer[row] ) ) for row, start in zip( rows, starts ) if row in moved ]
+
+	def intraline_regions( self, col ):
+		return [ ( offset + start, offset + end ) for row, offset, start, end in self.row_spans( col ) ]
+
+	def row_kinds( self ):
+		# one byte per row: ' ' both sides, '-' only in A, '+' only in B
+		kinds = bytearray( b' ' ) * len( self.bufferA )
+		for row in self.highlightA:
+			kinds[row] = ord( '-' )
+		for row in self.highlightB:
+			kinds[row] = ord( '+' )
+		return kinds
+
+	def row_marks( self ):
+		# one byte per row, 1 where the row has intraline spans
+		marks = bytearray( len( self.bufferA ) )
+		for row in self.subHighlightA.rows():
+			marks[row] = 1
+		for row in self.subHighlightB.rows():
+			marks[row] = 1
+		return marks
+
+	def buffers( self ):
+		return [ self.bufferA, self.bufferB ]
+
+	def text_a( self ):
+		return '\n'.join( self.bufferA )
+
+	def text_b( self ):
+		return '\n'.join( self.bufferB )
+
+
+# rows joined into each piece when a buffer is streamed out
+PIECE_ROWS = 4096
+
+def join_pieces( buffer, rows=PIECE_ROWS ):
+	# '\n'.join( buffer ) a few thousand rows at a time, so the whole text never
+	# has to exist as one string
+	for start in range( 0, len( buffer ), rows ):
+		piece = '\n'.join( buffer[start:start + rows] )
+		yield '\n' + piece if start else piece
+
+
+def compare_texts( textA, textB, options=None, progress=None ):
+	# progress, if given, is called as progress( phase, done, total ) and may
+	# raise CompareCancelled to stop the comparison
+	return compare_lines( textA.splitlines( False ), textB.splitlines( False ), options, progress )
+
+
+def compare_lines( linesA, linesB, options=None, progress=None ):
+	options = read_options( options )
+	enableIntraline = options['enable_intraline']
+	intralineDiffer = intraline.IntralineDiffer( options )
+
+	result = CompareResult()
+	bufferA = result.bufferA
+	bufferB = result.bufferB
+	highlightA = result.highlightA
+	highlightB = result.highlightB
+	subHighlightA = result.subHighlightA
+	subHighlightB = result.subHighlightB
+	highlightStartsA = result.highlightStartsA
+	highlightStartsB = result.highlightStartsB
+
+	# diff on the keys, the rows get the original lines. the diff comes in as
+	# runs of rows and goes straight into the padded buffers
+	keysA = line_keys( linesA, options )
+	keysB = line_keys( linesB, options )
+	runs = linediff.diff_runs( keysA, keysB, options['diff_algorithm'], progress )
+	nextA = 0
+	nextB = 0
+	totalLines = len( linesA ) + len( linesB )
+	reported = 0
+
+	# the last removed and added rows a '?' run can pair up, as ( row, text )
+	pairA = None
+	pairB = None
+	hasIntraline = False
+
+	# offset of the current row in each padded buffer
+	posA = 0
+	posB = 0
+
+	row = 0
+	for code, count in runs:
+		if progress is not None and row - reported >= PROGRESS_ROWS:
+			reported = row
+			progress( 'intraline', row, totalLines )
+
+		if code == '-':
+			for text in linesA[nextA:nextA + count]:
+				bufferA.append( text )
+				bufferB.append( '' )
+				highlightA.append( row )
+				highlightStartsA.append( posA )
+				posA += len( text ) + 1
+				posB += 1
+				row += 1
+			nextA += count
+			pairA = ( row - 1, text )
+			# a '?' only ever pairs a removed row with the added row right after it
+			pairB = None
+		elif code == '+':
+			first = ( row, linesB[nextB] )
+			for text in linesB[nextB:nextB + count]:
+				bufferA.append( '' )
+				bufferB.append( text )
+				highlightB.append( row )
+				highlightStartsB.append( posB )
+				posA += 1
+				posB += len( text ) + 1
+				row += 1
+			nextB += count
+			# with a '?' already seen, the first added row is the one paired up
+			pairB = first if hasIntraline and pairA is not None else ( row - 1, text )
+		elif code == ' ':
+			# only the keys have to match, each side keeps its own text
+			chunkA = linesA[nextA:nextA + count]
+			chunkB = linesB[nextB:nextB + count]
+			bufferA.extend( chunkA )
+			bufferB.extend( chunkB )
+			posA += sum( map( len, chunkA ) ) + count
+			posB += sum( map( len, chunkB ) ) + count
+			nextA += count
+			nextB += count
+			row += count
+			pairA = None
+			pairB = None
+		else:
+			hasIntraline = True
+
+		if hasIntraline and pairA is not None and pairB is not None:
+			if enableIntraline:
+				intralineStart = time.perf_counter()
+				spans = intralineDiffer.diff( pairA[1], pairB[1] )
+				result.intralineSeconds += time.perf_counter() - intralineStart
+				if spans:
+					for i1, i2, j1, j2 in spans:
+						subHighlightA.append( pairA[0], i1, i2 )
+						subHighlightB.append( pairB[0], j1, j2 )
+			pairA = None
+			pairB = None
+			hasIntraline = False
+
+	if options['detect_moves']:
+		find_moves( result, options )
+	return result
+
+
+def moved_rows( kinds, moves, col ):
+	# { row: row of the same line on the other side } for the lines of moved blocks.
+	# a block's lines are the next '-' rows from its first row in A and the next '+'
+	# rows from its first row in B, replaced lines can sit between them
+	rows = {}
+	for rowA, rowB, count in moves:
+		sideA = _kind_rows( kinds, rowA, count, ord( '-' ) )
+		sideB = _kind_rows( kinds, rowB, count, ord( '+' ) )
+		rows.update( zip( sideA, sideB ) if col == 'A' else zip( sideB, sideA ) )
+	return rows
+
+
+def _kind_rows( kinds, row, count, kind ):
+	rows = []
+	while len( rows ) < count:
+		if kinds[row] == kind:
+			rows.append( row )
+		row += 1
+	return rows
+
+
+def _runs( kinds, rows ):
+	# rows of one side get the same number while no unchanged row comes between them
+	runs = array.array( 'l' )
+	run = 0
+	last = 0
+	for row in rows:
+		run += kinds.count( b' ', last, row )
+		last = row
+		runs.append( run )
+	return runs
+
+
+def find_moves( result, options=None ):
+	# pair removed and added blocks with the same lines. every MOVE_MIN_LINES window of
+	# removed rows is indexed by its hash, added rows look their windows up and grow
+	# a hit for as long as both sides keep matching, so this stays close to linear
+	options = read_options( options )
+	rowsA = result.highlightA
+	rowsB = result.highlightB
+	keysA = line_keys( [ result.bufferA[row] for row in rowsA ], options )
+	keysB = line_keys( [ result.bufferB[row] for row in rowsB ], options )
+	kinds = result.row_kinds()
+	runsA = _runs( kinds, rowsA )
+	runsB = _runs( kinds, rowsB )
+	size = MOVE_MIN_LINES
+
+	def window( keys, runs, i ):
+		# the lines at i, or None if they aren't a block worth matching
+		if runs[i + size - 1] != runs[i]:
+			return None
+		lines = tuple( keys[i:i + size] )
+		if sum( len( line.strip() ) for line in lines ) < MOVE_MIN_CHARS:
+			return None
+		return lines
+
+	# the first window with each hash, the others with the same hash are chained
+	# through nextSame in order
+	index = {}
+	nextSame = array.array( 'l', [ -1 ] ) * len( keysA )
+	for i in range( len( keysA ) - size, -1, -1 ):
+		lines = window( keysA, runsA, i )
+		if lines is not None:
+			key = hash( lines )
+			nextSame[i] = index.get( key, -1 )
+			index[key] = i
+	if not index:
+		return
+
+	usedA = bytearray( len( keysA ) )
+	j = 0
+	while j <= len( keysB ) - size:
+		lines = window( keysB, runsB, j )
+		candidate = index.get( hash( lines ), -1 ) if lines is not None else -1
+		best = None
+		bestLength = 0
+		for n in range( MOVE_MAX_CANDIDATES ):
+			if candidate < 0:
+				break
+			i = candidate
+			candidate = nextSame[i]
+			if 1 in usedA[i:i + size] or tuple( keysA[i:i + size] ) != lines:
+				continue
+			length = size
+			while ( i + length < len( keysA ) and j + length < len( keysB ) and not usedA[i + length]
+					and runsA[i + length] == runsA[i] and runsB[j + length] == runsB[j]
+					and keysA[i + length] == keysB[j + length] ):
+				length += 1
+			if length > bestLength:
+				best = i
+				bestLength = length
+		if best is None:
+			j += 1
+			continue
+		usedA[best:best + bestLength] = b'\x01' * bestLength
+		result.moves.append( [ rowsA[best], rowsB[j], bestLength ] )
+		j += bestLength
+
+	# a moved line wasn't changed, intraline spans on it paired it with the wrong line
+	movedA = result.moved_rows( 'A' )
+	movedB = result.moved_rows( 'B' )
+	result.subHighlightA = Spans( span for span in result.subHighlightA if span[0] not in movedA )
+	result.subHighlightB = Spans( span for span in result.subHighlightB if span[0] not in movedB )
+
+
+def expand_to_anchors( kinds, start, end ):
+	# grow the row range [start, end) until it's bounded by rows both sides share
+	# (or the ends of the file), so a hunk is never re-diffed in pieces
+	equal = ord( ' ' )
+	while start > 0 and kinds[start - 1] != equal:
+		start -= 1
+	while end < len( kinds ) and kinds[end] != equal:
+		end += 1
+	return start, end
+
+
+def edit_window( kinds, start, end, deltas, edges_match ):
+	# the rows [start, end) to re-diff after a live edit of rows start to end.
+	# deltas are the rows each side gained, edges_match( start, end ) says if the
+	# rows just outside the window are still the ones we had (and is always true
+	# for the whole file)
+	start, end = expand_to_anchors( kinds, start, end )
+
+	# every side needs at least one row in the window
+	while any( end + delta <= start for delta in deltas ):
+		if end < len( kinds ):
+			end += 1
+		else:
+			start -= 1
+
+	# an edit that wasn't reported (an undo elsewhere, another plugin) shows up
+	# at the edges, keep doubling the window until they line up
+	while not edges_match( start, end ):
+		grow = end - start
+		start, end = expand_to_anchors( kinds, max( 0, start - grow ), min( len( kinds ), end + grow ) )
+	return start, end
+
+
+def window_kinds( oldRows, oldKinds, filler, rows ):
+	# match the rows of a window as they are now against the rows it had:
+	# unchanged rows keep their kind, anything new is a real line (None)
+	kinds = [ None ] * len( rows )
+
+	# rows up to the first difference and after the last one are where they
+	# were, which also says which of a run of blank rows was edited
+	head = 0
+	while head < min( len( oldRows ), len( rows ) ) and oldRows[head] == rows[head]:
+		head += 1
+	tail = 0
+	while tail < min( len( oldRows ), len( rows ) ) - head and oldRows[-1 - tail] == rows[-1 - tail]:
+		tail += 1
+	kinds[:head] = oldKinds[:head]
+	kinds[len( rows ) - tail:] = oldKinds[len( oldRows ) - tail:]
+
+	# in between, a blank row could be filler or a real blank line. match the
+	# blank rows to the old filler rows first, so a refresh never makes up blank
+	# lines, then the real rows in the gaps between them
+	old = oldRows[head:len( oldRows ) - tail]
+	new = rows[head:len( rows ) - tail]
+	oldKinds = oldKinds[head:len( oldRows ) - tail]
+	oldKeys = [ '' if kind == filler else ( 0, i ) for i, kind in enumerate( oldKinds ) ]
+	newKeys = [ '' if row == '' else ( 1, j ) for j, row in enumerate( new ) ]
+	i = j = 0
+	for tag, i1, i2, j1, j2 in linediff.get_opcodes( oldKeys, newKeys, 'myers' ) + [ ( 'equal', len( old ), len( old ), len( new ), len( new ) ) ]:
+		if tag != 'equal':
+			continue
+		for gapTag, g1, g2, h1, h2 in linediff.get_opcodes( old[i:i1], new[j:j1], 'myers' ):
+			if gapTag == 'equal':
+				kinds[head + j + h1:head + j + h2] = oldKinds[i + g1:i + g2]
+		kinds[head + j1:head + j2] = oldKinds[i1:i2]
+		i = i2
+		j = j2
+	return kinds
+
+
+def rediff_window( oldRows, kinds, newRows, options=None ):
+	# re-diff a window of a comparison after a live edit. oldRows are the padded
+	# rows of both sides the window had and kinds their row_kinds(), newRows the
+	# rows of both sides as they are now, filler included. returns the new
+	# CompareResult and, for each side, which of newRows hold real lines
+	filler = [ ord( '+' ), ord( '-' ) ]
+	lines = []
+	realRows = []
+	for n in range( 2 ):
+		rows = newRows[n]
+		rowKinds = window_kinds( oldRows[n], kinds, filler[n], rows )
+		real = [ row for row in range( len( rows ) ) if rowKinds[row] != filler[n] ]
+		lines.append( [ rows[row] for row in real ] )
+		realRows.append( real )
+	return compare_lines( lines[0], lines[1], options ), realRows
+
+
+# runs of row_kinds() bytes that aren't shared by both sides
+HUNK_RE = re.compile( b'[^ ]+' )
+
+def find_hunks( kinds ):
+	# ( first rows, last rows ) of each run of changed rows, both sorted
+	starts = []
+	ends = []
+	for match in HUNK_RE.finditer( kinds ):
+		starts.append( match.start() )
+		ends.append( match.end() - 1 )
+	return starts, ends
+
+
+def overview( kinds, marks, buckets, counted=b'-+' ):
+	# the rows cut into up to buckets even slices, each as [ first row, first changed
+	# row or -1, rows of each kind in counted..., marked rows ]. marks has a non-zero
+	# byte for each row with something else worth showing, like intraline spans
+	rows = len( kinds )
+	buckets = max( 1, min( buckets, rows ) )
+	slices = []
+	for n in range( buckets ):
+		start = rows * n // buckets
+		end = rows * ( n + 1 ) // buckets
+		match = HUNK_RE.search( kinds, start, end )
+		counts = [ start, match.start() if match else -1 ]
+		section = kinds[start:end]
+		counts.extend( section.count( counted[i:i + 1] ) for i in range( len( counted ) ) )
+		counts.append( end - start - marks[start:end].count( 0 ) )
+		slices.append( counts )
+	return slices
+
+
+# placeholder row standing in for folded unchanged lines
+FOLD_TEXT = '... %d unchanged lines ...'
+
+def collapse( result, context, minHidden=4 ):
+	# keep context rows around each hunk and fold longer unchanged stretches into
+	# one placeholder row. returns the collapsed result and a list of
+	# [ placeholder row, hidden lines A, hidden lines B ] in row order
+	kinds = result.row_kinds()
+	rows = len( kinds )
+	equal = ord( ' ' )
+
+	# unchanged stretches worth hiding, as old row ranges
+	hidden = []
+	row = 0
+	while row < rows:
+		if kinds[row] != equal:
+			row += 1
+			continue
+		end = row
+		while end < rows and kinds[end] == equal:
+			end += 1
+		start = row + ( context if row > 0 else 0 )
+		stop = end - ( context if end < rows else 0 )
+		if stop - start >= minHidden:
+			hidden.append( ( start, stop ) )
+		row = end
+
+	if not hidden:
+		return result, []
+
+	collapsed = CompareResult()
+	folds = []
+
+	# rows and characters each fold takes out, summed up to and including it
+	foldStarts = [ start for start, stop in hidden ]
+	rowShift = []
+	charShift = [ [], [] ]
+	removedRows = 0
+	removedChars = [ 0, 0 ]
+	last = 0
+	for start, stop in hidden:
+		placeholder = FOLD_TEXT % ( stop - start )
+		collapsed.bufferA.extend( result.bufferA[last:start] )
+		collapsed.bufferB.extend( result.bufferB[last:start] )
+		folds.append( [ start - removedRows, result.bufferA[start:stop], result.bufferB[start:stop] ] )
+		collapsed.bufferA.append( placeholder )
+		collapsed.bufferB.append( placeholder )
+
+		removedRows += stop - start - 1
+		rowShift.append( removedRows )
+		for n, buffer in enumerate( [ result.bufferA, result.bufferB ] ):
+			removedChars[n] += sum( len( line ) + 1 for line in buffer[start:stop] ) - len( placeholder ) - 1
+			charShift[n].append( removedChars[n] )
+		last = stop
+	collapsed.bufferA.extend( result.bufferA[last:] )
+	collapsed.bufferB.extend( result.bufferB[last:] )
+
+	# highlighted rows are never folded, they only move up by what was folded before them
+	def shifts( row, n ):
+		fold = bisect.bisect_right( foldStarts, row ) - 1
+		if fold < 0:
+			return 0, 0
+		return rowShift[fold], charShift[n][fold]
+
+	sides = [
+		( result.highlightA, result.highlightStartsA, collapsed.highlightA, collapsed.highlightStartsA ),
+		( result.highlightB, result.highlightStartsB, collapsed.highlightB, collapsed.highlightStartsB ),
+	]
+	for n, ( highlight, starts, newHighlight, newStarts ) in enumerate( sides ):
+		for row, start in zip( highlight, starts ):
+			rowDelta, charDelta = shifts( row, n )
+			newHighlight.append( row - rowDelta )
+			newStarts.append( start - charDelta )
+
+	for subHighlight, newSubHighlight in [ ( result.subHighlightA, collapsed.subHighlightA ), ( result.subHighlightB, collapsed.subHighlightB ) ]:
+		for row, i1, i2 in subHighlight:
+			newSubHighlight.append( row - shifts( row, 0 )[0], i1, i2 )
+
+	for rowA, rowB, count in result.moves:
+		collapsed.moves.append( [ rowA - shifts( rowA, 0 )[0], rowB - shifts( rowB, 0 )[0], count ] )
+
+	return collapsed, folds
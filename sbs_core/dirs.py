@@ -0,0 +1,79 @@
+import os
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+
+# threads hashing file contents, hashlib lets go of the GIL on big buffers
+HASH_WORKERS = 8
+
+HASH_CHUNK = 1024 * 1024
+
+STATUSES = [ 'modified', 'removed', 'added' ]
+
+
+def walk_tree( root ):
+	# { relative path: ( size, mtime ) } for every file under root
+	files = {}
+	for folder, dirnames, filenames in os.walk( root ):
+		dirnames.sort()
+		for filename in filenames:
+			path = os.path.join( folder, filename )
+			try:
+				stat = os.stat( path )
+			except OSError:
+				continue
+			files[os.path.relpath( path, root )] = ( stat.st_size, stat.st_mtime )
+	return files
+
+
+def file_digest( path ):
+	digest = hashlib.sha1()
+	with open( path, 'rb' ) as f:
+		while True:
+			chunk = f.read( HASH_CHUNK )
+			if not chunk:
+				break
+			digest.update( chunk )
+	return digest.digest()
+
+
+def _same_contents( pair ):
+	try:
+		return file_digest( pair[0] ) == file_digest( pair[1] )
+	except ( IOError, OSError ):
+		return False
+
+
+def compare_trees( rootA, rootB, strict=False, workers=HASH_WORKERS, progress=None ):
+	# returns sorted ( status, relative path ) entries for files that differ.
+	# files with the same size and mtime are taken as unchanged unless strict is on,
+	# different sizes are modified without reading, only the rest get hashed.
+	# progress, if given, is called as progress( 'hash', done, total )
+	filesA = walk_tree( rootA )
+	filesB = walk_tree( rootB )
+
+	entries = []
+	candidates = []
+	for path, ( size, mtime ) in filesA.items():
+		other = filesB.get( path )
+		if other is None:
+			entries.append( ( 'removed', path ) )
+		elif size != other[0]:
+			entries.append( ( 'modified', path ) )
+		elif strict or mtime != other[1]:
+			candidates.append( path )
+	for path in filesB:
+		if path not in filesA:
+			entries.append( ( 'added', path ) )
+
+	candidates.sort()
+	pairs = [ ( os.path.join( rootA, path ), os.path.join( rootB, path ) ) for path in candidates ]
+	with ThreadPoolExecutor( max_workers=max( 1, workers ) ) as pool:
+		for done, ( path, same ) in enumerate( zip( candidates, pool.map( _same_contents, pairs ) ), 1 ):
+			if not same:
+				entries.append( ( 'modified', path ) )
+			if progress is not None:
+				progress( 'hash', done, len( candidates ) )
+
+	entries.sort( key=lambda entry: ( STATUSES.index( entry[0] ), entry[1] ) )
+	return entries
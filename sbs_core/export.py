@@ -0,0 +1,161 @@
+import html
+
+from . import compare
+
+
+# rows rendered between writes, so a huge hunk is still written out in pieces
+EXPORT_ROWS = 1000
+
+DEFAULT_HTML_COLOURS = {
+	'removed': '#bf616a',
+	'added': '#a3be8c',
+	'modified_deletion': '#7fa3c7',
+	'modified_addition': '#7fa3c7',
+}
+
+HTML_HEAD = '''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>%(title)s</title>
+<style>
+body { font-family: monospace; margin: 0; }
+table { border-collapse: collapse; width: 100%%; table-layout: fixed; }
+td { white-space: pre; overflow: hidden; vertical-align: top; padding: 0 4px; tab-size: 4; }
+td.num { width: 4em; text-align: right; color: #888; border-right: 1px solid #ddd; }
+th { text-align: left; padding: 4px; background: #eee; }
+tr.hunk td { background: #f4f4f4; color: #888; }
+td.removed { background: %(removed)s; }
+td.added { background: %(added)s; }
+td.filler { background: #f4f4f4; }
+span.modified_deletion { background: %(modified_deletion)s; }
+span.modified_addition { background: %(modified_addition)s; }
+</style>
+</head>
+<body>
+<table>
+<tr><th colspan="2">%(nameA)s</th><th colspan="2">%(nameB)s</th></tr>
+'''
+
+HTML_TAIL = '''</table>
+</body>
+</html>
+'''
+
+
+def hunk_rows( kinds, context=None ):
+	# ( start row, end row, lines of A before it, lines of B before it ) for each
+	# hunk of row_kinds() with up to context unchanged rows either side, hunks
+	# whose context meets are merged. no context means the whole comparison
+	if context is None:
+		if kinds:
+			yield 0, len( kinds ), 0, 0
+		return
+
+	starts, ends = compare.find_hunks( kinds )
+	lineA = lineB = 0
+	row = 0
+	i = 0
+	while i < len( starts ):
+		start = max( 0, starts[i] - context )
+		end = min( len( kinds ), ends[i] + 1 + context )
+		while i + 1 < len( starts ) and starts[i + 1] - context <= end:
+			i += 1
+			end = min( len( kinds ), ends[i] + 1 + context )
+
+		# rows between hunks are on both sides
+		lineA += start - row
+		lineB += start - row
+		yield start, end, lineA, lineB
+
+		segment = kinds[start:end]
+		lineA += end - start - segment.count( b'+' )
+		lineB += end - start - segment.count( b'-' )
+		row = end
+		i += 1
+
+
+def _unified_range( line, count ):
+	# an empty side is numbered by the line before it
+	if count == 1:
+		return '%d' % ( line + 1 )
+	return '%d,%d' % ( line + 1 if count else line, count )
+
+
+def unified_diff( bufferA, bufferB, kinds, nameA, nameB, context=3 ):
+	# a unified patch of the padded rows, yielded a piece at a time
+	removed = ord( '-' )
+	added = ord( '+' )
+	yield '--- %s\n+++ %s\n' % ( nameA, nameB )
+	for start, end, lineA, lineB in hunk_rows( kinds, context ):
+		segment = kinds[start:end]
+		countA = end - start - segment.count( b'+' )
+		countB = end - start - segment.count( b'-' )
+		lines = [ '@@ -%s +%s @@\n' % ( _unified_range( lineA, countA ), _unified_range( lineB, countB ) ) ]
+		for row in range( start, end ):
+			kind = kinds[row]
+			if kind == removed:
+				lines.append( '-' + bufferA[row] + '\n' )
+			elif kind == added:
+				lines.append( '+' + bufferB[row] + '\n' )
+			else:
+				lines.append( ' ' + bufferA[row] + '\n' )
+			if len( lines ) >= EXPORT_ROWS:
+				yield ''.join( lines )
+				lines = []
+		yield ''.join( lines )
+
+
+def _html_text( text, spans, cls ):
+	parts = []
+	last = 0
+	for start, end in spans:
+		parts.append( html.escape( text[last:start] ) )
+		parts.append( '<span class="%s">%s</span>' % ( cls, html.escape( text[start:end] ) ) )
+		last = end
+	parts.append( html.escape( text[last:] ) )
+	return ''.join( parts )
+
+
+def html_report( bufferA, bufferB, kinds, intraA, intraB, nameA, nameB, colours=None, context=None ):
+	# a self-contained side by side page, yielded a piece at a time.
+	# intraA/B map rows to their intraline ( start col, end col ) spans
+	css = dict( DEFAULT_HTML_COLOURS )
+	css.update( colours or {} )
+	css['title'] = html.escape( '%s - %s' % ( nameA, nameB ) )
+	css['nameA'] = html.escape( nameA )
+	css['nameB'] = html.escape( nameB )
+	yield HTML_HEAD % css
+
+	removed = ord( '-' )
+	added = ord( '+' )
+	for start, end, lineA, lineB in hunk_rows( kinds, context ):
+		lines = []
+		if context is not None:
+			lines.append( '<tr class="hunk"><td class="num"></td><td colspan="3">@@ line %d / %d @@</td></tr>\n' % ( lineA + 1, lineB + 1 ) )
+		for row in range( start, end ):
+			kind = kinds[row]
+			if kind == added:
+				cellA = '<td class="num"></td><td class="filler"></td>'
+			else:
+				lineA += 1
+				cellA = '<td class="num">%d</td><td%s>%s</td>' % ( lineA, ' class="removed"' if kind == removed else '', _html_text( bufferA[row], intraA.get( row, () ), 'modified_deletion' ) )
+			if kind == removed:
+				cellB = '<td class="num"></td><td class="filler"></td>'
+			else:
+				lineB += 1
+				cellB = '<td class="num">%d</td><td%s>%s</td>' % ( lineB, ' class="added"' if kind == added else '', _html_text( bufferB[row], intraB.get( row, () ), 'modified_addition' ) )
+			lines.append( '<tr>%s%s</tr>\n' % ( cellA, cellB ) )
+			if len( lines ) >= EXPORT_ROWS:
+				yield ''.join( lines )
+				lines = []
+		yield ''.join( lines )
+
+	yield HTML_TAIL
+
+
+def write_export( path, pieces ):
+	# pieces is one of the generators above, nothing more than a piece is held at once
+	with open( path, 'w', encoding='utf-8', newline='\n' ) as f:
+		for piece in pieces:
+			f.write( piece )
@@ -0,0 +1,111 @@
+import os
+import mmap
+import codecs
+
+
+# files at least this big are decoded straight out of a memory map
+MMAP_THRESHOLD = 4 * 1024 * 1024
+
+# bytes read at a time when files are compared or dumped, a multiple of HEX_WIDTH
+READ_CHUNK = 1024 * 1024
+
+# bytes looked at to decide whether a file is binary
+BINARY_SAMPLE = 8192
+
+# bytes per row of a hex dump
+HEX_WIDTH = 16
+
+# the offset column of hex_lines() rows, masked out so rows match by their bytes
+HEX_OFFSET_PATTERN = '^[0-9a-f]{8,}  '
+
+# printable ascii stays, everything else shows as '.'
+HEX_PRINTABLE = bytes( byte if 32 <= byte < 127 else ord( '.' ) for byte in range( 256 ) )
+
+DEFAULT_FALLBACK_ENCODINGS = [ 'cp1252', 'latin-1' ]
+
+BOMS = [
+	( codecs.BOM_UTF32_LE, 'utf-32' ),
+	( codecs.BOM_UTF32_BE, 'utf-32' ),
+	( codecs.BOM_UTF8, 'utf-8-sig' ),
+	( codecs.BOM_UTF16_LE, 'utf-16' ),
+	( codecs.BOM_UTF16_BE, 'utf-16' ),
+]
+
+
+def detect_bom( data ):
+	for bom, encoding in BOMS:
+		if data[:len( bom )] == bom:
+			return encoding
+	return None
+
+
+def decode( data, fallback_encodings=None ):
+	# data is anything supporting the buffer protocol, returns ( text, encoding )
+	encoding = detect_bom( data[:4] )
+	if encoding is not None:
+		return str( data, encoding ), encoding
+
+	try:
+		return str( data, 'utf-8' ), 'utf-8'
+	except UnicodeDecodeError:
+		pass
+
+	for encoding in fallback_encodings or DEFAULT_FALLBACK_ENCODINGS:
+		try:
+			return str( data, encoding ), encoding
+		except ( UnicodeDecodeError, LookupError ):
+			pass
+
+	# latin-1 can't fail, so this only happens with a useless fallback list
+	return str( data, 'latin-1' ), 'latin-1'
+
+
+def read_text( path, fallback_encodings=None ):
+	# one read per file: small files are read whole, big ones mapped and decoded in place
+	with open( path, 'rb' ) as f:
+		size = os.fstat( f.fileno() ).st_size
+		if size == 0:
+			return '', 'utf-8'
+		if size < MMAP_THRESHOLD:
+			return decode( f.read(), fallback_encodings )
+
+		mapped = mmap.mmap( f.fileno(), 0, access=mmap.ACCESS_READ )
+		try:
+			return decode( mapped, fallback_encodings )
+		finally:
+			mapped.close()
+
+
+def same_contents( pathA, pathB ):
+	# sizes first, then both files a chunk at a time, stopping at the first difference
+	if os.path.getsize( pathA ) != os.path.getsize( pathB ):
+		return False
+	with open( pathA, 'rb' ) as fA, open( pathB, 'rb' ) as fB:
+		while True:
+			chunkA = fA.read( READ_CHUNK )
+			if chunkA != fB.read( READ_CHUNK ):
+				return False
+			if not chunkA:
+				return True
+
+
+def is_binary( path ):
+	# a NUL byte near the start, unless a BOM says it's UTF-16/32 text
+	with open( path, 'rb' ) as f:
+		sample = f.read( BINARY_SAMPLE )
+	return b'\0' in sample and detect_bom( sample[:4] ) is None
+
+
+def hex_lines( path, width=HEX_WIDTH ):
+	# the file as hex dump rows of width bytes: offset, bytes, printable text.
+	# read a chunk at a time and never decoded
+	with open( path, 'rb' ) as f:
+		offset = 0
+		while True:
+			chunk = f.read( READ_CHUNK )
+			if not chunk:
+				break
+			for i in range( 0, len( chunk ), width ):
+				row = chunk[i:i + width]
+				yield '%08x  %-*s  |%s|' % ( offset + i, width * 3 - 1, ' '.join( '%02x' % byte for byte in row ), row.translate( HEX_PRINTABLE ).decode( 'ascii' ) )
+			offset += len( chunk )
@@ -0,0 +1,74 @@
+import re
+import difflib
+
+from . import linediff
+
+
+GRANULARITIES = [ 'token', 'char' ]
+
+# words, runs of whitespace and single punctuation characters
+TOKEN_RE = re.compile( r'\w+|\s+|[^\w\s]', re.UNICODE )
+
+
+def tokenize( line ):
+	# returns the tokens and the column each one starts at (plus the line length)
+	tokens = TOKEN_RE.findall( line )
+	starts = []
+	col = 0
+	for token in tokens:
+		starts.append( col )
+		col += len( token )
+	starts.append( col )
+	return tokens, starts
+
+
+class IntralineDiffer( object ):
+	# settings are read once per comparison, not once per line
+	def __init__( self, options ):
+		self.emptyspace = options['intraline_emptyspace']
+		self.maxLineLength = options['intraline_max_line_length']
+		self.granularity = options['intraline_granularity']
+		self.refineLength = options['intraline_refine_length']
+
+	def add_span( self, spans, tag, i1, i2, j1, j2 ):
+		if self.emptyspace:
+			if tag == 'insert':
+				i2 += j2 - j1
+			if tag == 'delete':
+				j2 += i2 - i1
+		spans.append( ( i1, i2, j1, j2 ) )
+
+	def char_spans( self, spans, lineA, lineB, offsetA=0, offsetB=0 ):
+		s = difflib.SequenceMatcher( None, lineA, lineB )
+		for tag, i1, i2, j1, j2 in s.get_opcodes():
+			if tag != 'equal':
+				self.add_span( spans, tag, i1 + offsetA, i2 + offsetA, j1 + offsetB, j2 + offsetB )
+
+	def diff( self, lineA, lineB ):
+		# returns ( i1, i2, j1, j2 ) column spans that differ,
+		# or None when the lines are too long and should just be highlighted whole
+		if self.maxLineLength > 0 and max( len( lineA ), len( lineB ) ) > self.maxLineLength:
+			return None
+
+		spans = []
+		if self.granularity == 'char':
+			self.char_spans( spans, lineA, lineB )
+			return spans
+
+		tokensA, startsA = tokenize( lineA )
+		tokensB, startsB = tokenize( lineB )
+		for tag, i1, i2, j1, j2 in linediff.get_opcodes( tokensA, tokensB ):
+			if tag == 'equal':
+				continue
+
+			c1 = startsA[i1]
+			c2 = startsA[i2]
+			d1 = startsB[j1]
+			d2 = startsB[j2]
+
+			# only short replaced tokens are worth refining down to characters
+			if tag == 'replace' and c2 - c1 <= self.refineLength and d2 - d1 <= self.refineLength:
+				self.char_spans( spans, lineA[c1:c2], lineB[d1:d2], c1, d1 )
+			else:
+				self.add_span( spans, tag, c1, c2, d1, d2 )
+		return spans
@@ -0,0 +1,437 @@
+import array
+import bisect
+import collections
+import difflib
+
+
+# engines return opcodes in the same format as difflib.SequenceMatcher.get_opcodes()
+ALGORITHMS = [ 'histogram', 'myers', 'ndiff' ]
+DEFAULT_ALGORITHM = 'histogram'
+
+# histogram diff falls back to myers when every candidate line is this common
+MAX_CHAIN = 64
+
+# regions bigger than this (lines on both sides) are split on patience anchors first
+PATIENCE_MIN = 1024
+
+# myers gives up on an optimal split once the edit cost passes this
+# (scaled up for large regions, same idea as xdiff's "too expensive" heuristic)
+MIN_COST = 256
+
+# ratio two replaced lines need before they are paired for intraline diffing
+PAIR_CUTOFF = 0.75
+
+# regions worked through between progress callbacks
+PROGRESS_STEPS = 64
+
+
+def _common_prefix( a, b, alo, ahi, blo, bhi ):
+	n = 0
+	while alo + n < ahi and blo + n < bhi and a[alo + n] == b[blo + n]:
+		n += 1
+	return n
+
+def _common_suffix( a, b, alo, ahi, blo, bhi ):
+	n = 0
+	while ahi - n > alo and bhi - n > blo and a[ahi - n - 1] == b[bhi - n - 1]:
+		n += 1
+	return n
+
+
+def _bisect( a, b, alo, ahi, blo, bhi ):
+	# linear space myers: find the middle snake of a[alo:ahi] vs b[blo:bhi]
+	# returns a split point (x, y) relative to alo/blo
+	len1 = ahi - alo
+	len2 = bhi - blo
+	max_d = ( len1 + len2 + 1 ) // 2
+	max_cost = max( MIN_COST, int( ( len1 + len2 ) ** 0.5 ) )
+	v_offset = max_d
+	v_length = 2 * max_d + 2
+	v1 = [ -1 ] * v_length
+	v2 = [ -1 ] * v_length
+	v1[v_offset + 1] = 0
+	v2[v_offset + 1] = 0
+	delta = len1 - len2
+	front = ( delta % 2 != 0 )
+	k1start = k1end = k2start = k2end = 0
+
+	for d in range( max_d ):
+		# walk the forward path one step
+		for k1 in range( -d + k1start, d + 1 - k1end, 2 ):
+			k1_offset = v_offset + k1
+			if k1 == -d or ( k1 != d and v1[k1_offset - 1] < v1[k1_offset + 1] ):
+				x1 = v1[k1_offset + 1]
+			else:
+				x1 = v1[k1_offset - 1] + 1
+			y1 = x1 - k1
+			while x1 < len1 and y1 < len2 and a[alo + x1] == b[blo + y1]:
+				x1 += 1
+				y1 += 1
+			v1[k1_offset] = x1
+			if x1 > len1:
+				k1end += 2
+			elif y1 > len2:
+				k1start += 2
+			elif front:
+				k2_offset = v_offset + delta - k1
+				if 0 <= k2_offset < v_length and v2[k2_offset] != -1:
+					if x1 >= len1 - v2[k2_offset]:
+						return ( x1, y1 )
+
+		# walk the reverse path one step
+		for k2 in range( -d + k2start, d + 1 - k2end, 2 ):
+			k2_offset = v_offset + k2
+			if k2 == -d or ( k2 != d and v2[k2_offset - 1] < v2[k2_offset + 1] ):
+				x2 = v2[k2_offset + 1]
+			else:
+				x2 = v2[k2_offset - 1] + 1
+			y2 = x2 - k2
+			while x2 < len1 and y2 < len2 and a[ahi - x2 - 1] == b[bhi - y2 - 1]:
+				x2 += 1
+				y2 += 1
+			v2[k2_offset] = x2
+			if x2 > len1:
+				k2end += 2
+			elif y2 > len2:
+				k2start += 2
+			elif not front:
+				k1_offset = v_offset + delta - k2
+				if 0 <= k1_offset < v_length and v1[k1_offset] != -1:
+					x1 = v1[k1_offset]
+					if x1 >= len1 - x2:
+						return ( x1, v_offset + x1 - k1_offset )
+
+		if d >= max_cost:
+			# too expensive: split at the furthest reaching forward path instead
+			best = None
+			for k1 in range( -d + k1start, d + 1 - k1end, 2 ):
+				x1 = v1[v_offset + k1]
+				y1 = x1 - k1
+				if x1 < 0 or x1 > len1 or y1 < 0 or y1 > len2:
+					continue
+				if best is None or x1 + y1 > best[0] + best[1]:
+					best = ( x1, y1 )
+			if best is not None and 0 < best[0] + best[1] < len1 + len2:
+				return best
+
+	# no commonality at all
+	return None
+
+
+def _myers_region( a, b, alo, ahi, blo, bhi, pending ):
+	# a block replaced wholesale has no snake to find, don't pay for the search
+	if ahi - alo + bhi - blo > MIN_COST and set( a[alo:ahi] ).isdisjoint( b[blo:bhi] ):
+		return
+
+	split = _bisect( a, b, alo, ahi, blo, bhi )
+	if split is None:
+		return
+	x, y = split
+	pending.append( ( alo + x, ahi, blo + y, bhi, False ) )
+	pending.append( ( alo, alo + x, blo, blo + y, False ) )
+
+def _patience_anchors( a, b, alo, ahi, blo, bhi ):
+	# lines unique to both sides, reduced to their longest increasing run.
+	# only the position of a line unique so far is kept (-1 once it repeats),
+	# a full index of every line's positions is only built if this finds nothing
+	seenA = {}
+	for i in range( alo, ahi ):
+		seenA[a[i]] = -1 if a[i] in seenA else i
+	seenB = {}
+	for j in range( blo, bhi ):
+		if seenA.get( b[j], -1 ) >= 0:
+			seenB[b[j]] = -1 if b[j] in seenB else j
+
+	# candidates live in parallel arrays, links holds the candidate before each
+	# one in its increasing run (-1 for none)
+	candidatesI = array.array( 'l' )
+	candidatesJ = array.array( 'l' )
+	links = array.array( 'l' )
+	tails = array.array( 'l' )
+	tailIndexes = array.array( 'l' )
+	for j in range( blo, bhi ):
+		if seenB.get( b[j], -1 ) != j:
+			continue
+		i = seenA[b[j]]
+		n = bisect.bisect_left( tails, i )
+		links.append( tailIndexes[n - 1] if n else -1 )
+		candidatesI.append( i )
+		candidatesJ.append( j )
+		if n == len( tails ):
+			tails.append( i )
+			tailIndexes.append( len( candidatesI ) - 1 )
+		else:
+			tails[n] = i
+			tailIndexes[n] = len( candidatesI ) - 1
+
+	# consecutive anchors come back as one ( i, j, size ) run, a big file with a
+	# few edits is a handful of runs rather than an anchor per line
+	anchors = []
+	if tails:
+		candidate = tailIndexes[-1]
+		while candidate >= 0:
+			i = candidatesI[candidate]
+			j = candidatesJ[candidate]
+			if anchors and anchors[-1][0] == i + 1 and anchors[-1][1] == j + 1:
+				anchors[-1] = ( i, j, anchors[-1][2] + 1 )
+			else:
+				anchors.append( ( i, j, 1 ) )
+			candidate = links[candidate]
+	return anchors
+
+def _histogram_region( a, b, alo, ahi, blo, bhi, pending ):
+	# in big regions, lines unique on both sides split the region in one go
+	# (one anchor at a time goes quadratic with many hunks), smaller regions
+	# get the better single anchor below. anchors come back last to first,
+	# which is the order the stack wants
+	if ahi - alo + bhi - blo > PATIENCE_MIN:
+		anchors = _patience_anchors( a, b, alo, ahi, blo, bhi )
+		if not anchors:
+			# no line is unique on both sides, so every anchor would be a line
+			# that repeats and splitting on them one at a time goes quadratic
+			_myers_region( a, b, alo, ahi, blo, bhi, pending )
+			return
+		nextI = ahi
+		nextJ = bhi
+		for i, j, size in anchors:
+			# only regions with lines on both sides have anything left to match
+			if i + size < nextI and j + size < nextJ:
+				pending.append( ( i + size, nextI, j + size, nextJ, True ) )
+			pending.append( ( i, j, size ) )
+			nextI = i
+			nextJ = j
+		pending.append( ( alo, nextI, blo, nextJ, True ) )
+		return
+
+	# index the lines of a, then find the least common line of b that also appears in a
+	index = {}
+	for i in range( alo, ahi ):
+		occ = index.get( a[i] )
+		if occ is None:
+			index[a[i]] = [ i ]
+		else:
+			occ.append( i )
+
+	best = None
+	bestCount = MAX_CHAIN
+	anyCommon = False
+	j = blo
+	while j < bhi:
+		occ = index.get( b[j] )
+		if occ is None:
+			j += 1
+			continue
+		anyCommon = True
+		if len( occ ) > bestCount:
+			j += 1
+			continue
+
+		nextJ = j + 1
+		for i in occ:
+			# grow the match in both directions
+			si = i
+			sj = j
+			while si > alo and sj > blo and a[si - 1] == b[sj - 1]:
+				si -= 1
+				sj -= 1
+			ei = i + 1
+			ej = j + 1
+			while ei < ahi and ej < bhi and a[ei] == b[ej]:
+				ei += 1
+				ej += 1
+
+			# like git, a run is as rare as its rarest line
+			count = min( len( index[a[k]] ) for k in range( si, ei ) )
+			if best is None or count < bestCount or ( count == bestCount and ( ei - si ) > ( best[2] - best[0] ) ):
+				best = ( si, sj, ei, ej )
+				bestCount = count
+			nextJ = max( nextJ, ej )
+		j = nextJ
+
+	if not anyCommon:
+		# replaced wholesale
+		return
+	if best is None:
+		# nothing rare enough to anchor on
+		_myers_region( a, b, alo, ahi, blo, bhi, pending )
+		return
+
+	si, sj, ei, ej = best
+	pending.append( ( ei, ahi, ej, bhi, True ) )
+	pending.append( ( si, sj, ei - si ) )
+	pending.append( ( alo, si, blo, sj, True ) )
+
+
+def _matching_blocks( a, b, histogram, progress=None ):
+	# regions are processed left to right off an explicit stack so that
+	# blocks come out sorted and deep recursion can't blow python's stack
+	blocks = []
+	pending = [ ( 0, len( a ), 0, len( b ), histogram ) ]
+
+	steps = 0
+	while pending:
+		steps += 1
+		if progress is not None and steps % PROGRESS_STEPS == 0 and blocks:
+			progress( 'diff', blocks[-1][0], len( a ) )
+
+		item = pending.pop()
+		if len( item ) == 3:
+			blocks.append( item )
+			continue
+		alo, ahi, blo, bhi, useHistogram = item
+
+		n = _common_prefix( a, b, alo, ahi, blo, bhi )
+		if n:
+			blocks.append( ( alo, blo, n ) )
+			alo += n
+			blo += n
+		n = _common_suffix( a, b, alo, ahi, blo, bhi )
+		if n:
+			ahi -= n
+			bhi -= n
+			pending.append( ( ahi, bhi, n ) )
+
+		if alo < ahi and blo < bhi:
+			if useHistogram:
+				_histogram_region( a, b, alo, ahi, blo, bhi, pending )
+			else:
+				_myers_region( a, b, alo, ahi, blo, bhi, pending )
+
+	return blocks
+
+
+def _blocks_to_opcodes( blocks, lenA, lenB ):
+	opcodes = []
+	i = 0
+	j = 0
+	merged = []
+	for ai, bj, size in blocks:
+		if size == 0:
+			continue
+		if merged and merged[-1][0] + merged[-1][2] == ai and merged[-1][1] + merged[-1][2] == bj:
+			merged[-1] = ( merged[-1][0], merged[-1][1], merged[-1][2] + size )
+		else:
+			merged.append( ( ai, bj, size ) )
+	merged.append( ( lenA, lenB, 0 ) )
+
+	for ai, bj, size in merged:
+		tag = ''
+		if i < ai and j < bj:
+			tag = 'replace'
+		elif i < ai:
+			tag = 'delete'
+		elif j < bj:
+			tag = 'insert'
+		if tag:
+			opcodes.append( ( tag, i, ai, j, bj ) )
+		i = ai + size
+		j = bj + size
+		if size:
+			opcodes.append( ( 'equal', ai, i, bj, j ) )
+	return opcodes
+
+
+def _intern( linesA, linesB ):
+	# the engines only ever compare lines for equality, so give each distinct
+	# line a small int and let them compare and hash those instead
+	ids = {}
+	a = [ ids.setdefault( line, len( ids ) ) for line in linesA ]
+	b = [ ids.setdefault( line, len( ids ) ) for line in linesB ]
+	return a, b
+
+def _middle_opcodes( a, b, algorithm, progress ):
+	if algorithm == 'ndiff':
+		return difflib.SequenceMatcher( None, a, b, autojunk=False ).get_opcodes()
+	blocks = _matching_blocks( a, b, algorithm != 'myers', progress )
+	return _blocks_to_opcodes( blocks, len( a ), len( b ) )
+
+def get_opcodes( linesA, linesB, algorithm=DEFAULT_ALGORITHM, progress=None ):
+	# progress, if given, is called as progress( 'diff', done, total ) now and then
+	lenA = len( linesA )
+	lenB = len( linesB )
+
+	# identical runs at either end never reach the engine, they go back in as equal
+	prefix = _common_prefix( linesA, linesB, 0, lenA, 0, lenB )
+	suffix = _common_suffix( linesA, linesB, prefix, lenA, prefix, lenB )
+	a, b = _intern( linesA[prefix:lenA - suffix], linesB[prefix:lenB - suffix] )
+
+	opcodes = []
+	if prefix:
+		opcodes.append( ( 'equal', 0, prefix, 0, prefix ) )
+	if a or b:
+		for tag, i1, i2, j1, j2 in _middle_opcodes( a, b, algorithm, progress ):
+			opcodes.append( ( tag, i1 + prefix, i2 + prefix, j1 + prefix, j2 + prefix ) )
+	if suffix:
+		opcodes.append( ( 'equal', lenA - suffix, lenA, lenB - suffix, lenB ) )
+	return opcodes
+
+
+def _similar( lineA, lineB ):
+	# same upper bounds as SequenceMatcher.real_quick_ratio() and quick_ratio(),
+	# without building the matcher's index of lineB
+	total = len( lineA ) + len( lineB )
+	if total == 0:
+		return True
+	if 2.0 * min( len( lineA ), len( lineB ) ) / total <= PAIR_CUTOFF:
+		return False
+	common = collections.Counter( lineA ) & collections.Counter( lineB )
+	return 2.0 * sum( common.values() ) / total > PAIR_CUTOFF
+
+def _replace_runs( linesA, linesB, i1, i2, j1, j2 ):
+	# pair lines positionally, similar pairs are followed by a '?' run to trigger
+	# intraline diffing, runs of dissimilar lines are dumped as a block like ndiff does
+	pendingA = 0
+	pendingB = 0
+	for n in range( max( i2 - i1, j2 - j1 ) ):
+		hasA = i1 + n < i2
+		hasB = j1 + n < j2
+
+		if hasA and hasB and _similar( linesA[i1 + n], linesB[j1 + n] ):
+			if pendingA:
+				yield '-', pendingA
+			if pendingB:
+				yield '+', pendingB
+			pendingA = 0
+			pendingB = 0
+
+			yield '-', 1
+			yield '+', 1
+			yield '?', 0
+			continue
+
+		pendingA += hasA
+		pendingB += hasB
+
+	if pendingA:
+		yield '-', pendingA
+	if pendingB:
+		yield '+', pendingB
+
+
+def diff_runs( linesA, linesB, algorithm=DEFAULT_ALGORITHM, progress=None ):
+	# the rows of difflib.ndiff as ( code, count ) runs, code is one of '-', '+', ' '
+	# or '?' (always a count of 0). the lines themselves never go through the stream,
+	# the caller takes the next count lines of either side
+	if algorithm == 'ndiff':
+		lenA = len( linesA )
+		lenB = len( linesB )
+		prefix = _common_prefix( linesA, linesB, 0, lenA, 0, lenB )
+		suffix = _common_suffix( linesA, linesB, prefix, lenA, prefix, lenB )
+		if prefix:
+			yield ' ', prefix
+		for line in difflib.ndiff( linesA[prefix:lenA - suffix], linesB[prefix:lenB - suffix], charjunk=None ):
+			yield line[0], 0 if line[0] == '?' else 1
+		if suffix:
+			yield ' ', suffix
+		return
+
+	for tag, i1, i2, j1, j2 in get_opcodes( linesA, linesB, algorithm, progress ):
+		if tag == 'equal':
+			yield ' ', i2 - i1
+		elif tag == 'delete':
+			yield '-', i2 - i1
+		elif tag == 'insert':
+			yield '+', j2 - j1
+		else:
+			for run in _replace_runs( linesA, linesB, i1, i2, j1, j2 ):
+				yield run
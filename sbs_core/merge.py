@@ -0,0 +1,128 @@
+from . import linediff
+from . import compare
+
+
+# row kinds: unchanged, changed in ours only, in theirs only, the same in both, conflict
+CHUNK_KINDS = ' otbc'
+
+VIEW_NAMES = [ 'base', 'ours', 'theirs' ]
+
+# views that get their lines highlighted for each kind, in base, ours, theirs order
+HIGHLIGHTED = {
+	' ': (),
+	'o': ( 0, 1 ),
+	't': ( 0, 2 ),
+	'b': ( 0, 1, 2 ),
+	'c': ( 0, 1, 2 ),
+}
+
+
+class MergeResult( object ):
+	def __init__( self ):
+		# padded output for the base, ours and theirs views
+		self.bufferBase = []
+		self.bufferOurs = []
+		self.bufferTheirs = []
+
+		# one byte per row, see CHUNK_KINDS
+		self.kinds = bytearray()
+
+		# ( start, end ) offsets of changed lines per view, conflicts are kept apart
+		self.changed = [ [], [], [] ]
+		self.conflicts = [ [], [], [] ]
+
+		# number of chunks of each kind
+		self.counts = dict( ( kind, 0 ) for kind in CHUNK_KINDS[1:] )
+
+	def buffers( self ):
+		return [ self.bufferBase, self.bufferOurs, self.bufferTheirs ]
+
+	def row_kinds( self ):
+		return bytearray( self.kinds )
+
+	def row_marks( self ):
+		# no intraline spans in a three-way comparison
+		return bytearray( len( self.kinds ) )
+
+	def texts( self ):
+		return [ '\n'.join( buffer ) for buffer in self.buffers() ]
+
+
+def _base_map( opcodes, lenBase ):
+	# for each base line, the line it's equal to on the other side or -1
+	mapped = [ -1 ] * lenBase
+	for tag, i1, i2, j1, j2 in opcodes:
+		if tag == 'equal':
+			mapped[i1:i2] = range( j1, j2 )
+	return mapped
+
+
+def compare_three( textBase, textOurs, textTheirs, options=None, progress=None ):
+	# progress, if given, is called as progress( phase, done, total ) and may
+	# raise compare.CompareCancelled to stop the comparison
+	options = compare.read_options( options )
+	base = textBase.splitlines( False )
+	ours = textOurs.splitlines( False )
+	theirs = textTheirs.splitlines( False )
+
+	# lines are matched by their keys (see the ignore options), the rows keep the originals
+	keys = [ compare.line_keys( lines, options ) for lines in [ base, ours, theirs ] ]
+
+	# both sides are diffed against the base once, everything else comes from these
+	toOurs = _base_map( linediff.get_opcodes( keys[0], keys[1], options['diff_algorithm'], progress ), len( base ) )
+	toTheirs = _base_map( linediff.get_opcodes( keys[0], keys[2], options['diff_algorithm'], progress ), len( base ) )
+
+	result = MergeResult()
+	buffers = result.buffers()
+	positions = [ 0, 0, 0 ]
+
+	def emit( kind, chunks ):
+		rows = max( len( chunk ) for chunk in chunks )
+		for n, chunk in enumerate( chunks ):
+			regions = result.conflicts[n] if kind == 'c' else result.changed[n]
+			highlight = n in HIGHLIGHTED[kind]
+			for line in chunk:
+				if highlight:
+					regions.append( ( positions[n], positions[n] + len( line ) ) )
+				positions[n] += len( line ) + 1
+			buffers[n].extend( chunk )
+
+			# filler lines keep the rows lined up
+			buffers[n].extend( [ '' ] * ( rows - len( chunk ) ) )
+			positions[n] += rows - len( chunk )
+		result.kinds.extend( kind.encode( 'ascii' ) * rows )
+
+	# base lines both sides still have split the files into runs of stable rows
+	# and the chunks in between
+	i = o = t = 0
+	stable = [ k for k in range( len( base ) ) if toOurs[k] >= 0 and toTheirs[k] >= 0 ]
+	run = 0
+	for k in stable + [ None ]:
+		ends = [ len( base ), len( ours ), len( theirs ) ] if k is None else [ k, toOurs[k], toTheirs[k] ]
+		chunks = [ lines[start:end] for lines, start, end in zip( [ base, ours, theirs ], [ i, o, t ], ends ) ]
+		chunkKeys = [ lines[start:end] for lines, start, end in zip( keys, [ i, o, t ], ends ) ]
+
+		if any( chunks ) or k is None:
+			if run:
+				emit( ' ', [ base[i - run:i], ours[o - run:o], theirs[t - run:t] ] )
+				run = 0
+
+		if any( chunks ):
+			if chunkKeys[1] == chunkKeys[0]:
+				kind = 't'
+			elif chunkKeys[2] == chunkKeys[0]:
+				kind = 'o'
+			elif chunkKeys[1] == chunkKeys[2]:
+				kind = 'b'
+			else:
+				kind = 'c'
+			result.counts[kind] += 1
+			emit( kind, chunks )
+
+		if k is not None:
+			run += 1
+			i = k + 1
+			o = toOurs[k] + 1
+			t = toTheirs[k] + 1
+
+	return result
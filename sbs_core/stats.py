@@ -0,0 +1,82 @@
+import json
+import time
+import collections
+import contextlib
+
+
+# comparisons kept in the history
+HISTORY_LENGTH = 20
+
+
+class CompareStats( object ):
+	# wall time of each stage of one comparison plus whatever sizes go with it,
+	# a disabled one records nothing so callers don't have to check
+	def __init__( self, source, enabled=True ):
+		self.source = source
+		self.enabled = enabled
+		self.started = time.time()
+		self.stages = []
+		self.sizes = {}
+
+	@contextlib.contextmanager
+	def stage( self, name, **sizes ):
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.add( name, time.perf_counter() - start, **sizes )
+
+	def add( self, name, seconds, **sizes ):
+		if self.enabled:
+			self.stages.append( [ name, seconds ] )
+			self.sizes.update( sizes )
+
+	def count( self, **sizes ):
+		if self.enabled:
+			self.sizes.update( sizes )
+
+	def total( self ):
+		return sum( seconds for name, seconds in self.stages )
+
+	def as_dict( self ):
+		return {
+			'source': self.source,
+			'started': time.strftime( '%Y-%m-%d %H:%M:%S', time.localtime( self.started ) ),
+			'total_seconds': self.total(),
+			'stages': [ { 'name': name, 'seconds': seconds } for name, seconds in self.stages ],
+			'sizes': self.sizes,
+		}
+
+	def format( self ):
+		lines = [ '%s  %s  %.3fs total' % ( self.as_dict()['started'], self.source, self.total() ) ]
+		for name, seconds in self.stages:
+			lines.append( '    %-24s %9.3fs' % ( name, seconds ) )
+		for name in sorted( self.sizes ):
+			lines.append( '    %-24s %10s' % ( name, self.sizes[name] ) )
+		return '\n'.join( lines )
+
+
+def result_sizes( result ):
+	# the sizes recorded for a comparison result: rows in the padded views, rows
+	# only in A, rows only in B and the two together
+	removed = len( result.highlightA )
+	added = len( result.highlightB )
+	return { 'rows': len( result.bufferA ), 'removed_rows': removed, 'added_rows': added, 'changed_rows': removed + added }
+
+
+class StatsHistory( object ):
+	def __init__( self, length=HISTORY_LENGTH ):
+		self.runs = collections.deque( maxlen=length )
+
+	def add( self, stats ):
+		if stats.enabled and stats.stages:
+			self.runs.append( stats )
+
+	def as_json( self ):
+		return json.dumps( { 'runs': [ stats.as_dict() for stats in self.runs ] }, indent=4, sort_keys=True )
+
+	def format( self ):
+		if not self.runs:
+			return 'No comparisons recorded yet (is "collect_stats" on?)'
+		# newest first
+		return '\n\n'.join( stats.format() for stats in reversed( self.runs ) )
@@ -0,0 +1,96 @@
+# tests for batch comparisons, run with plain python:
+#   python -m unittest discover tests
+#   python tests/test_batch.py
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+
+from sbs_core import batch
+
+
+class BatchTestCase( unittest.TestCase ):
+	def setUp( self ):
+		self.folder = tempfile.mkdtemp()
+		self.addCleanup( shutil.rmtree, self.folder )
+
+	def path( self, name ):
+		return os.path.join( self.folder, name )
+
+	def write( self, name, data ):
+		with open( self.path( name ), 'wb' ) as f:
+			f.write( data )
+		return self.path( name )
+
+
+class ManifestTests( BatchTestCase ):
+	def test_json_pairs( self ):
+		self.write( 'pairs.json', b'[ [ "a.txt", "b.txt" ], { "A": "sub/c.txt", "B": "/abs/d.txt" } ]' )
+		self.assertEqual( batch.read_manifest( self.path( 'pairs.json' ) ), [ ( self.path( 'a.txt' ), self.path( 'b.txt' ) ), ( self.path( os.path.join( 'sub', 'c.txt' ) ), os.path.abspath( '/abs/d.txt' ) ) ] )
+
+	def test_text_pairs( self ):
+		self.write( 'pairs.txt', b'# old and new\na.txt\tb.txt\n\n  c.txt \t d.txt\n' )
+		self.assertEqual( batch.read_manifest( self.path( 'pairs.txt' ) ), [ ( self.path( 'a.txt' ), self.path( 'b.txt' ) ), ( self.path( 'c.txt' ), self.path( 'd.txt' ) ) ] )
+
+	def test_bad_entries( self ):
+		for data in [ b'a.txt\n', b'a.txt\tb.txt\tc.txt\n', b'[ { "A": "a.txt" } ]' ]:
+			self.write( 'pairs', data )
+			self.assertRaises( ValueError, batch.read_manifest, self.path( 'pairs' ) )
+
+
+class CompareBatchTests( BatchTestCase ):
+	def test_results( self ):
+		one = self.write( 'one.txt', b'keep\nvalue = 1\nkeep\n' )
+		same = self.write( 'same.txt', b'keep\nvalue = 1\nkeep\n' )
+		two = self.write( 'two.txt', b'keep\nvalue = 2\nkeep\nmore\n' )
+		missing = self.path( 'missing.txt' )
+		entries = batch.compare_batch( [ ( one, two ), ( one, same ), ( one, missing ), ( two, one ) ], workers=2 )
+
+		# in the order they were asked for
+		self.assertEqual( [ ( entry['A'], entry['B'] ) for entry in entries ], [ ( one, two ), ( one, same ), ( one, missing ), ( two, one ) ] )
+		self.assertEqual( [ entry['status'] for entry in entries ], [ 'different', 'same', 'error', 'different' ] )
+
+		different = entries[0]
+		self.assertEqual( ( different['removed'], different['added'] ), ( 1, 2 ) )
+		self.assertGreater( different['intraline'], 0 )
+		self.assertEqual( different['hunks'], [ [ 2, 1, 2, 1 ], [ 3, 0, 4, 1 ] ] )
+		self.assertEqual( entries[3]['hunks'], [ [ 2, 1, 2, 1 ], [ 4, 1, 3, 0 ] ] )
+
+		# a missing file is reported, not raised
+		self.assertIn( 'missing.txt', entries[2]['error'] )
+		self.assertEqual( entries[2]['hunks'], [] )
+
+	def test_options_can_make_files_the_same( self ):
+		pathA = self.write( 'a.txt', b'value = 1\n' )
+		pathB = self.write( 'b.txt', b'value  =  1\n' )
+		self.assertEqual( batch.compare_batch( [ ( pathA, pathB ) ] )[0]['status'], 'different' )
+		self.assertEqual( batch.compare_batch( [ ( pathA, pathB ) ], { 'ignore_whitespace': True } )[0]['status'], 'same' )
+
+	def test_binary_pairs( self ):
+		pathA = self.write( 'a.bin', bytes( range( 64 ) ) )
+		pathB = self.write( 'b.bin', bytes( range( 32 ) ) + b'\xff' + bytes( range( 33, 64 ) ) )
+		entry = batch.compare_batch( [ ( pathA, pathB ) ] )[0]
+		self.assertEqual( ( entry['status'], entry.get( 'binary' ) ), ( 'different', True ) )
+		# hunks count rows of HEX_WIDTH bytes
+		self.assertEqual( entry['hunks'], [ [ 3, 1, 3, 1 ] ] )
+
+	def test_reports( self ):
+		pathA = self.write( 'a.txt', b'old\n' )
+		pathB = self.write( 'b.txt', b'new\n' )
+		entries = batch.compare_batch( [ ( pathA, pathB ), ( pathA, self.path( 'missing.txt' ) ) ] )
+		report = batch.format_report( entries )
+		self.assertTrue( report.startswith( '2 pairs: 1 different, 0 same, 1 errors\n' ) )
+		self.assertIn( '    @@ -1,1 +1,1 @@\n', report )
+
+		batch.write_report( self.path( os.path.join( 'out', 'report.json' ) ), entries )
+		with open( self.path( os.path.join( 'out', 'report.json' ) ), encoding='utf-8' ) as f:
+			self.assertEqual( json.load( f ), { 'pairs': entries } )
+
+
+if __name__ == '__main__':
+	unittest.main()
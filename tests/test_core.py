@@ -0,0 +1,395 @@
+# tests for the headless comparison core, run with plain python:
+#   python -m unittest discover tests
+#   python tests/test_core.py
+#
+# every case is checked against invariants rather than fixed output, so the
+# engines can change how they pick matches without breaking these
+
+import os
+import sys
+import random
+import unittest
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+
+from sbs_core import linediff
+from sbs_core import compare
+from sbs_core import cache
+from sbs_core import merge
+
+
+ALGORITHMS = [ 'histogram', 'myers', 'ndiff' ]
+
+# few enough words that lines repeat, which is where the engines differ
+WORDS = [ 'alpha', 'beta', 'gamma', 'delta', '{', '}', 'x = 1', 'x = 2', 'return x' ]
+
+
+def random_lines( rng, count ):
+	return [ rng.choice( WORDS ) + ( ' %d' % rng.randrange( 3 ) if rng.random() < 0.3 else '' ) for n in range( count ) ]
+
+def edited( rng, lines ):
+	# a copy with lines changed, removed and added here and there
+	result = []
+	for line in lines:
+		roll = rng.random()
+		if roll < 0.1:
+			continue
+		if roll < 0.2:
+			result.append( line + ' changed' )
+		else:
+			result.append( line )
+		if rng.random() < 0.1:
+			result.append( rng.choice( WORDS ) )
+	return result
+
+def pairs( seed=1234, count=60 ):
+	# ( linesA, linesB ) cases, the edge cases first
+	yield [], []
+	yield [ 'a' ], []
+	yield [], [ 'b' ]
+	yield [ 'same', 'lines' ], [ 'same', 'lines' ]
+	yield [ 'a', 'b', 'c' ], [ 'x', 'y' ]
+	rng = random.Random( seed )
+	for n in range( count ):
+		linesA = random_lines( rng, rng.randrange( 1, 80 ) )
+		yield linesA, edited( rng, linesA )
+
+def row_offsets( buffer ):
+	# character offset of each row in '\n'.join( buffer )
+	offsets = []
+	offset = 0
+	for line in buffer:
+		offsets.append( offset )
+		offset += len( line ) + 1
+	return offsets
+
+def real_rows( buffer, kinds, filler ):
+	return [ line for line, kind in zip( buffer, kinds ) if kind != ord( filler ) ]
+
+
+class OpcodeTests( unittest.TestCase ):
+	def check_opcodes( self, linesA, linesB, opcodes ):
+		# the opcodes walk both sides from start to end without gaps
+		i = j = 0
+		for tag, i1, i2, j1, j2 in opcodes:
+			self.assertIn( tag, ( 'equal', 'replace', 'delete', 'insert' ) )
+			self.assertEqual( ( i1, j1 ), ( i, j ) )
+			self.assertTrue( i1 <= i2 and j1 <= j2 )
+			if tag == 'equal':
+				self.assertEqual( linesA[i1:i2], linesB[j1:j2] )
+			elif tag == 'delete':
+				self.assertTrue( i1 < i2 and j1 == j2 )
+			elif tag == 'insert':
+				self.assertTrue( i1 == i2 and j1 < j2 )
+			else:
+				self.assertTrue( i1 < i2 and j1 < j2 )
+			i = i2
+			j = j2
+		self.assertEqual( ( i, j ), ( len( linesA ), len( linesB ) ) )
+
+	def test_opcodes_cover_both_sides( self ):
+		for algorithm in ALGORITHMS:
+			for linesA, linesB in pairs():
+				self.check_opcodes( linesA, linesB, linediff.get_opcodes( linesA, linesB, algorithm ) )
+
+	def test_identical_lines_are_one_equal_run( self ):
+		lines = [ 'a', 'b', 'a' ]
+		for algorithm in ALGORITHMS:
+			self.assertEqual( linediff.get_opcodes( lines, list( lines ), algorithm ), [ ( 'equal', 0, 3, 0, 3 ) ] )
+
+	def test_no_unique_lines_goes_to_myers( self ):
+		# every line is on both sides twice, so a big region has no patience
+		# anchors and histogram hands it to myers as a whole
+		linesA = []
+		linesB = []
+		for n in range( 0, 1000, 2 ):
+			linesA += [ 'line %d' % n, 'line %d' % n, 'line %d' % ( n + 1 ), 'line %d' % ( n + 1 ) ]
+			linesB += [ 'line %d' % ( n + 1 ), 'line %d' % n ] * 2
+		self.assertGreater( len( linesA ) + len( linesB ), linediff.PATIENCE_MIN )
+		self.assertEqual( linediff.get_opcodes( linesA, linesB, 'histogram' ), linediff.get_opcodes( linesA, linesB, 'myers' ) )
+
+
+class PaddedBufferTests( unittest.TestCase ):
+	def check_result( self, linesA, linesB, result ):
+		kinds = result.row_kinds()
+		self.assertEqual( len( result.bufferA ), len( result.bufferB ) )
+		self.assertEqual( len( kinds ), len( result.bufferA ) )
+
+		# taking the filler rows out gives back the inputs
+		self.assertEqual( real_rows( result.bufferA, kinds, '+' ), linesA )
+		self.assertEqual( real_rows( result.bufferB, kinds, '-' ), linesB )
+		for n, kind in enumerate( kinds ):
+			if kind == ord( '+' ):
+				self.assertEqual( result.bufferA[n], '' )
+			elif kind == ord( '-' ):
+				self.assertEqual( result.bufferB[n], '' )
+
+		for col in 'AB':
+			rows, starts, buffer = result.side( col )[:3]
+			offsets = row_offsets( buffer )
+			text = '\n'.join( buffer )
+			self.assertEqual( text, result.text_a() if col == 'A' else result.text_b() )
+			self.assertEqual( ''.join( compare.join_pieces( buffer, rows=7 ) ), text )
+
+			# highlighted rows are the changed rows of that side, at their offsets
+			self.assertEqual( list( rows ), [ n for n, kind in enumerate( kinds ) if kind == ord( '-' if col == 'A' else '+' ) ] )
+			self.assertEqual( list( starts ), [ offsets[row] for row in rows ] )
+
+			# every region stays inside one highlighted row
+			for row, offset, start, end in result.row_spans( col ):
+				self.assertIn( row, rows )
+				self.assertEqual( offset, offsets[row] )
+				self.assertTrue( 0 <= start <= end <= len( buffer[row] ) )
+			for start, end in result.line_regions( col ) + result.intraline_regions( col ) + result.moved_regions( col ):
+				row = text.count( '\n', 0, start )
+				self.assertIn( row, rows )
+				self.assertTrue( offsets[row] <= start <= end <= offsets[row] + len( buffer[row] ) )
+
+	def test_buffers_and_offsets( self ):
+		for algorithm in ALGORITHMS:
+			for linesA, linesB in pairs():
+				result = compare.compare_lines( linesA, linesB, { 'diff_algorithm': algorithm } )
+				self.check_result( linesA, linesB, result )
+
+	def test_ignore_options_keep_original_lines( self ):
+		linesA = [ 'Header', 'value  =  1', 'stamp 10:42:01', 'end' ]
+		linesB = [ 'header', 'value = 1', 'stamp 11:00:59', 'end', 'extra' ]
+		options = { 'ignore_case': True, 'ignore_whitespace': True, 'ignore_patterns': [ r'\d\d:\d\d:\d\d' ] }
+		result = compare.compare_lines( linesA, linesB, options )
+		self.check_result( linesA, linesB, result )
+		self.assertEqual( bytes( result.row_kinds() ), b'    +' )
+
+
+class CacheTests( unittest.TestCase ):
+	def assertSameResult( self, first, second ):
+		self.assertEqual( first.bufferA, second.bufferA )
+		self.assertEqual( first.bufferB, second.bufferB )
+		self.assertEqual( list( first.highlightA ), list( second.highlightA ) )
+		self.assertEqual( list( first.highlightB ), list( second.highlightB ) )
+		self.assertEqual( list( first.highlightStartsA ), list( second.highlightStartsA ) )
+		self.assertEqual( list( first.highlightStartsB ), list( second.highlightStartsB ) )
+		self.assertEqual( list( first.subHighlightA ), list( second.subHighlightA ) )
+		self.assertEqual( list( first.subHighlightB ), list( second.subHighlightB ) )
+		self.assertEqual( [ list( move ) for move in first.moves ], [ list( move ) for move in second.moves ] )
+
+	def test_pack_unpack_round_trip( self ):
+		for options in [ {}, { 'ignore_case': True }, { 'diff_algorithm': 'myers', 'enable_intraline': False } ]:
+			for linesA, linesB in pairs( seed=7 ):
+				result = compare.compare_lines( linesA, linesB, options )
+				self.assertSameResult( cache.unpack( cache.pack( result ), linesA, linesB ), result )
+
+	def test_round_trip_with_moves( self ):
+		block = [ 'def moved_function( value ):', '	total = value * 2', '	return total + 1' ]
+		linesA = [ 'start' ] + block + [ 'middle %d' % n for n in range( 10 ) ] + [ 'end' ]
+		linesB = [ 'start' ] + [ 'middle %d' % n for n in range( 10 ) ] + block + [ 'end' ]
+		result = compare.compare_lines( linesA, linesB )
+		self.assertTrue( result.moves )
+		self.assertSameResult( cache.unpack( cache.pack( result ), linesA, linesB ), result )
+
+	def test_key_depends_on_texts_and_options( self ):
+		key = cache.cache_key( [ 'a', 'b' ], {} )
+		self.assertEqual( key, cache.cache_key( [ 'a', 'b' ], {} ) )
+		self.assertNotEqual( key, cache.cache_key( [ 'b', 'a' ], {} ) )
+		self.assertNotEqual( key, cache.cache_key( [ 'a', 'b' ], { 'diff_algorithm': 'myers' } ) )
+
+	def test_key_is_the_same_for_text_and_lines( self ):
+		lines = [ 'one', 'two', '', 'three' ]
+		text = '\n'.join( lines )
+		self.assertEqual( cache.cache_key( [ text, text ], {} ), cache.cache_key( [ lines, lines ], {} ) )
+		self.assertNotEqual( cache.cache_key( [ text, text ], {} ), cache.cache_key( [ text, text ], { 'ignore_case': True } ) )
+
+
+class CollapseTests( unittest.TestCase ):
+	def test_folds_expand_back_to_the_result( self ):
+		for linesA, linesB in pairs( seed=21 ):
+			result = compare.compare_lines( linesA, linesB )
+			for context in [ 0, 1, 3 ]:
+				collapsed, folds = compare.collapse( result, context )
+				if not folds:
+					self.assertIs( collapsed, result )
+					continue
+
+				# putting the hidden lines back in place of each placeholder gives the full buffers
+				buffers = [ list( collapsed.bufferA ), list( collapsed.bufferB ) ]
+				for row, hiddenA, hiddenB in reversed( folds ):
+					self.assertEqual( buffers[0][row], buffers[1][row] )
+					self.assertEqual( buffers[0][row], compare.FOLD_TEXT % len( hiddenA ) )
+					buffers[0][row:row + 1] = hiddenA
+					buffers[1][row:row + 1] = hiddenB
+				self.assertEqual( buffers, [ result.bufferA, result.bufferB ] )
+
+				for col in 'AB':
+					rows, starts, buffer, spans = collapsed.side( col )
+					oldRows, oldStarts, oldBuffer, oldSpans = result.side( col )
+					offsets = row_offsets( buffer )
+
+					# the same rows stay highlighted, with offsets into the collapsed text
+					self.assertEqual( [ buffer[row] for row in rows ], [ oldBuffer[row] for row in oldRows ] )
+					self.assertEqual( list( starts ), [ offsets[row] for row in rows ] )
+					self.assertEqual( [ ( buffer[row], start, end ) for row, start, end in spans ], [ ( oldBuffer[row], start, end ) for row, start, end in oldSpans ] )
+					self.assertEqual( len( collapsed.line_regions( col ) ), len( result.line_regions( col ) ) )
+
+	def test_short_stretches_stay( self ):
+		result = compare.compare_lines( [ 'a', 'b', 'c', 'd' ], [ 'a', 'b', 'x', 'd' ] )
+		collapsed, folds = compare.collapse( result, 1 )
+		self.assertEqual( folds, [] )
+		self.assertIs( collapsed, result )
+
+
+class OverviewTests( unittest.TestCase ):
+	def test_no_changes( self ):
+		for kinds in [ bytearray(), bytearray( b'    ' ) ]:
+			self.assertEqual( compare.find_hunks( kinds ), ( [], [] ) )
+			slices = compare.overview( kinds, bytearray( len( kinds ) ), 2 )
+			self.assertEqual( [ counts[1:] for counts in slices ], [ [ -1, 0, 0, 0 ] ] * len( slices ) )
+		# an empty comparison is still one slice
+		self.assertEqual( compare.overview( bytearray(), bytearray(), 4 ), [ [ 0, -1, 0, 0, 0 ] ] )
+
+	def test_hunk_at_the_first_row( self ):
+		kinds = bytearray( b'-+      ' )
+		marks = bytearray( len( kinds ) )
+		marks[0] = 1
+		self.assertEqual( compare.find_hunks( kinds ), ( [ 0 ], [ 1 ] ) )
+		self.assertEqual( compare.overview( kinds, marks, 4 ), [ [ 0, 0, 1, 1, 1 ], [ 2, -1, 0, 0, 0 ], [ 4, -1, 0, 0, 0 ], [ 6, -1, 0, 0, 0 ] ] )
+
+	def test_hunk_at_the_last_row( self ):
+		kinds = bytearray( b'       --+' )
+		self.assertEqual( compare.find_hunks( kinds ), ( [ 7 ], [ 9 ] ) )
+		self.assertEqual( compare.overview( kinds, bytearray( len( kinds ) ), 3 ), [ [ 0, -1, 0, 0, 0 ], [ 3, -1, 0, 0, 0 ], [ 6, 7, 2, 1, 0 ] ] )
+
+	def test_more_buckets_than_rows( self ):
+		# one slice per row, never an empty one
+		kinds = bytearray( b' -+' )
+		self.assertEqual( compare.overview( kinds, bytearray( len( kinds ) ), 10 ), [ [ 0, -1, 0, 0, 0 ], [ 1, 1, 1, 0, 0 ], [ 2, 2, 0, 1, 0 ] ] )
+
+	def test_three_way_kinds( self ):
+		kinds = bytearray( b' o tc' )
+		self.assertEqual( compare.find_hunks( kinds ), ( [ 1, 3 ], [ 1, 4 ] ) )
+		self.assertEqual( compare.overview( kinds, bytearray( len( kinds ) ), 1, b'otbc' ), [ [ 0, 1, 1, 1, 0, 1, 0 ] ] )
+
+
+class RediffWindowTests( unittest.TestCase ):
+	# a change block, as padded rows:
+	#   keep   keep
+	#   one
+	#   two
+	#   three
+	#          uno
+	#          dos
+	#   end    end
+	linesA = [ 'keep', 'one', 'two', 'three', 'end' ]
+	linesB = [ 'keep', 'uno', 'dos', 'end' ]
+
+	def rediff( self, linesA, linesB, side, rows ):
+		# the real lines of both sides once the padded rows of one side have
+		# become rows, checked against the new result
+		result = compare.compare_lines( linesA, linesB )
+		old = result.buffers()
+		new = [ list( old[0] ), list( old[1] ) ]
+		new[side] = rows
+		rediffed, realRows = compare.rediff_window( old, result.row_kinds(), new )
+		lines = [ [ new[n][row] for row in realRows[n] ] for n in range( 2 ) ]
+		kinds = rediffed.row_kinds()
+		self.assertEqual( real_rows( rediffed.bufferA, kinds, '+' ), lines[0] )
+		self.assertEqual( real_rows( rediffed.bufferB, kinds, '-' ), lines[1] )
+		return lines
+
+	def test_padded_rows( self ):
+		result = compare.compare_lines( self.linesA, self.linesB )
+		self.assertEqual( result.bufferB, [ 'keep', '', '', '', 'uno', 'dos', 'end' ] )
+		self.assertEqual( bytes( result.row_kinds() ), b' ---++ ' )
+
+	def test_insert_in_change_block( self ):
+		lines = self.rediff( self.linesA, self.linesB, 1, [ 'keep', '', '', '', 'uno', 'new', 'dos', 'end' ] )
+		self.assertEqual( lines, [ self.linesA, [ 'keep', 'uno', 'new', 'dos', 'end' ] ] )
+
+	def test_delete_in_change_block( self ):
+		lines = self.rediff( self.linesA, self.linesB, 1, [ 'keep', '', '', '', 'dos', 'end' ] )
+		self.assertEqual( lines, [ self.linesA, [ 'keep', 'dos', 'end' ] ] )
+
+	def test_edit_in_change_block( self ):
+		lines = self.rediff( self.linesA, self.linesB, 0, [ 'keep', 'one', 'TWO', 'three', '', '', 'end' ] )
+		self.assertEqual( lines, [ [ 'keep', 'one', 'TWO', 'three', 'end' ], self.linesB ] )
+
+	def test_typing_on_filler_row( self ):
+		lines = self.rediff( self.linesA, self.linesB, 1, [ 'keep', 'typed', '', '', 'uno', 'dos', 'end' ] )
+		self.assertEqual( lines, [ self.linesA, [ 'keep', 'typed', 'uno', 'dos', 'end' ] ] )
+
+	def test_blank_lines_next_to_filler( self ):
+		# B's blank rows are a real blank line, two filler rows, a real blank line
+		linesA = [ 'keep', '', 'gone', 'gone too', '', 'end' ]
+		linesB = [ 'keep', '', '', 'end' ]
+		result = compare.compare_lines( linesA, linesB )
+		self.assertEqual( bytes( result.row_kinds() ), b'  --  ' )
+
+		# typing on either filler row keeps both blank lines
+		for rows in [ [ 'keep', '', 'x', '', '', 'end' ], [ 'keep', '', '', 'x', '', 'end' ] ]:
+			self.assertEqual( self.rediff( linesA, linesB, 1, rows ), [ linesA, [ 'keep', '', 'x', '', 'end' ] ] )
+
+		# a new blank line is one more, never one made out of filler
+		lines = self.rediff( linesA, linesB, 1, [ 'keep', '', '', '', '', '', 'end' ] )
+		self.assertEqual( lines[1], [ 'keep', '', '', '', 'end' ] )
+		lines = self.rediff( linesA, linesB, 1, [ 'keep', '', '', '', '', 'END' ] )
+		self.assertEqual( lines[1], [ 'keep', '', '', 'END' ] )
+
+	def test_edit_window( self ):
+		kinds = bytearray( b'  --  ++  ' )
+		self.assertEqual( compare.edit_window( kinds, 3, 4, [ 0, 0 ], lambda start, end: True ), ( 2, 4 ) )
+		# a side that lost every row of the window gets one back
+		self.assertEqual( compare.edit_window( kinds, 0, 1, [ 0, -1 ], lambda start, end: True ), ( 0, 2 ) )
+		# edges that don't line up double the window until they do
+		self.assertEqual( compare.edit_window( kinds, 0, 1, [ 0, 0 ], lambda start, end: end - start >= 3 ), ( 0, 4 ) )
+
+
+class MergeTests( unittest.TestCase ):
+	def triples( self, seed=5, count=40 ):
+		rng = random.Random( seed )
+		yield [ 'a' ], [ 'a' ], [ 'a' ]
+		yield [ 'a', 'b' ], [ 'a', 'x' ], [ 'a', 'y' ]
+		for n in range( count ):
+			base = random_lines( rng, rng.randrange( 1, 60 ) )
+			yield base, edited( rng, base ), edited( rng, base )
+
+	def test_rows_line_up( self ):
+		for base, ours, theirs in self.triples():
+			result = merge.compare_three( '\n'.join( base ), '\n'.join( ours ), '\n'.join( theirs ) )
+			buffers = result.buffers()
+			kinds = result.row_kinds()
+			self.assertEqual( len( kinds ), len( buffers[0] ) )
+			self.assertTrue( all( len( buffer ) == len( kinds ) for buffer in buffers ) )
+			self.assertTrue( all( chr( kind ) in merge.CHUNK_KINDS for kind in kinds ) )
+
+			# none of the test lines are empty, so the empty rows are the filler
+			for buffer, lines in zip( buffers, [ base, ours, theirs ] ):
+				self.assertEqual( [ line for line in buffer if line ], lines )
+
+			# unchanged rows are the same in all three, and a side only one of
+			# them touched still matches the base on the other
+			for row, kind in enumerate( kinds ):
+				kind = chr( kind )
+				if kind == ' ':
+					self.assertTrue( buffers[0][row] == buffers[1][row] == buffers[2][row] )
+				elif kind == 'o':
+					self.assertEqual( buffers[2][row], buffers[0][row] )
+				elif kind == 't':
+					self.assertEqual( buffers[1][row], buffers[0][row] )
+
+			# changed and conflict regions are whole rows of their view
+			for n, text in enumerate( result.texts() ):
+				offsets = row_offsets( buffers[n] )
+				for start, end in result.changed[n] + result.conflicts[n]:
+					row = text.count( '\n', 0, start )
+					self.assertEqual( ( start, end ), ( offsets[row], offsets[row] + len( buffers[n][row] ) ) )
+					self.assertIn( n, merge.HIGHLIGHTED[chr( kinds[row] )] )
+
+	def test_chunk_kinds( self ):
+		base = [ 'keep', 'ours changes this', 'keep', 'theirs changes this', 'keep', 'both change this', 'keep', 'conflict', 'keep' ]
+		ours = [ 'keep', 'changed by ours', 'keep', 'theirs changes this', 'keep', 'same change', 'keep', 'ours version', 'keep' ]
+		theirs = [ 'keep', 'ours changes this', 'keep', 'changed by theirs', 'keep', 'same change', 'keep', 'theirs version', 'keep' ]
+		result = merge.compare_three( '\n'.join( base ), '\n'.join( ours ), '\n'.join( theirs ) )
+		self.assertEqual( bytes( result.row_kinds() ), b' o t b c ' )
+		self.assertEqual( result.counts, { 'o': 1, 't': 1, 'b': 1, 'c': 1 } )
+
+
+if __name__ == '__main__':
+	unittest.main()
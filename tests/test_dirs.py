@@ -0,0 +1,93 @@
+# tests for folder comparisons, run with plain python:
+#   python -m unittest discover tests
+#   python tests/test_dirs.py
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+
+from sbs_core import dirs
+
+
+# a fixed mtime, so files written at different moments can look untouched
+MTIME = 1500000000
+
+class CompareTreesTests( unittest.TestCase ):
+	def setUp( self ):
+		folder = tempfile.mkdtemp()
+		self.addCleanup( shutil.rmtree, folder )
+		self.rootA = os.path.join( folder, 'a' )
+		self.rootB = os.path.join( folder, 'b' )
+
+	def write( self, root, path, data, mtime=MTIME ):
+		path = os.path.join( root, *path.split( '/' ) )
+		if not os.path.isdir( os.path.dirname( path ) ):
+			os.makedirs( os.path.dirname( path ) )
+		with open( path, 'wb' ) as f:
+			f.write( data )
+		os.utime( path, ( mtime, mtime ) )
+
+	def write_both( self, path, data ):
+		self.write( self.rootA, path, data )
+		self.write( self.rootB, path, data )
+
+	def compare( self, strict=False ):
+		hashed = []
+		entries = dirs.compare_trees( self.rootA, self.rootB, strict, 2, lambda phase, done, total: hashed.append( done ) )
+		return entries, len( hashed )
+
+	def test_only_on_one_side( self ):
+		self.write_both( 'same.txt', b'same' )
+		self.write( self.rootA, 'gone.txt', b'gone' )
+		self.write( self.rootB, 'new.txt', b'new' )
+		self.write( self.rootB, 'another.txt', b'new' )
+		entries, hashed = self.compare()
+		self.assertEqual( entries, [ ( 'removed', 'gone.txt' ), ( 'added', 'another.txt' ), ( 'added', 'new.txt' ) ] )
+		self.assertEqual( hashed, 0 )
+
+	def test_different_size_is_modified_without_hashing( self ):
+		self.write( self.rootA, 'file.txt', b'short' )
+		self.write( self.rootB, 'file.txt', b'longer' )
+		self.assertEqual( self.compare(), ( [ ( 'modified', 'file.txt' ) ], 0 ) )
+
+	def test_same_size_and_mtime_is_taken_as_unchanged( self ):
+		self.write( self.rootA, 'file.txt', b'before' )
+		self.write( self.rootB, 'file.txt', b'after!' )
+		self.assertEqual( self.compare(), ( [], 0 ) )
+
+	def test_strict_reads_every_file( self ):
+		self.write_both( 'same.txt', b'same' )
+		self.write( self.rootA, 'file.txt', b'before' )
+		self.write( self.rootB, 'file.txt', b'after!' )
+		self.assertEqual( self.compare( strict=True ), ( [ ( 'modified', 'file.txt' ) ], 2 ) )
+
+	def test_different_mtime_is_hashed( self ):
+		self.write( self.rootA, 'touched.txt', b'same' )
+		self.write( self.rootB, 'touched.txt', b'same', MTIME + 60 )
+		self.write( self.rootA, 'changed.txt', b'before' )
+		self.write( self.rootB, 'changed.txt', b'after!', MTIME + 60 )
+		self.assertEqual( self.compare(), ( [ ( 'modified', 'changed.txt' ) ], 2 ) )
+
+	def test_nested_folders( self ):
+		self.write_both( 'top.txt', b'top' )
+		self.write_both( 'sub/deeper/same.txt', b'same' )
+		self.write( self.rootA, 'sub/deeper/changed.txt', b'one' )
+		self.write( self.rootB, 'sub/deeper/changed.txt', b'three' )
+		self.write( self.rootA, 'sub/only_a/file.txt', b'a' )
+		self.write( self.rootB, 'sub/file.txt', b'b' )
+		entries = self.compare()[0]
+		join = os.path.join
+		self.assertEqual( entries, [ ( 'modified', join( 'sub', 'deeper', 'changed.txt' ) ), ( 'removed', join( 'sub', 'only_a', 'file.txt' ) ), ( 'added', join( 'sub', 'file.txt' ) ) ] )
+
+	def test_empty_folders( self ):
+		os.makedirs( self.rootA )
+		os.makedirs( os.path.join( self.rootB, 'empty' ) )
+		self.assertEqual( self.compare(), ( [], 0 ) )
+
+
+if __name__ == '__main__':
+	unittest.main()
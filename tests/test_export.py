@@ -0,0 +1,129 @@
+# tests for the patch and html exports, run with plain python:
+#   python -m unittest discover tests
+#   python tests/test_export.py
+
+import os
+import sys
+import random
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+
+from sbs_core import compare
+from sbs_core import export
+
+
+WORDS = [ 'alpha', 'beta', 'gamma', 'delta', '{', '}', '', 'x = 1', 'return x' ]
+
+def pairs( seed=4321, count=40 ):
+	# ( linesA, linesB ) cases, the edge cases first
+	yield [ 'a' ], []
+	yield [], [ 'b' ]
+	yield [ 'a', 'b', 'c' ], [ 'x', 'y' ]
+	rng = random.Random( seed )
+	for n in range( count ):
+		linesA = [ rng.choice( WORDS ) for i in range( rng.randrange( 1, 120 ) ) ]
+		linesB = []
+		for line in linesA:
+			roll = rng.random()
+			if roll < 0.05:
+				continue
+			linesB.append( line + ' changed' if roll < 0.1 else line )
+			if rng.random() < 0.05:
+				linesB.append( rng.choice( WORDS ) )
+		yield linesA, linesB
+
+def intra_rows( spans ):
+	# Spans as the { row: [ ( start col, end col ) ] } the exports take
+	rows = {}
+	values = spans.values
+	for i in range( 0, len( values ), 3 ):
+		rows.setdefault( values[i], [] ).append( ( values[i + 1], values[i + 2] ) )
+	return rows
+
+
+class UnifiedDiffTests( unittest.TestCase ):
+	def patch( self, result, context ):
+		return ''.join( export.unified_diff( result.bufferA, result.bufferB, result.row_kinds(), 'a.txt', 'b.txt', context ) )
+
+	def test_identical_files_are_only_the_header( self ):
+		result = compare.compare_lines( [ 'same', 'lines' ], [ 'same', 'lines' ] )
+		self.assertEqual( self.patch( result, 3 ), '--- a.txt\n+++ b.txt\n' )
+
+	def test_hunk_headers( self ):
+		linesA = [ 'line %d' % n for n in range( 20 ) ]
+		linesB = list( linesA )
+		linesB[2] = 'changed 2'
+		del linesB[15]
+		result = compare.compare_lines( linesA, linesB )
+		headers = [ line for line in self.patch( result, 1 ).split( '\n' ) if line.startswith( '@@' ) ]
+		self.assertEqual( headers, [ '@@ -2,3 +2,3 @@', '@@ -15,3 +15,2 @@' ] )
+		# with enough context the two hunks meet and become one
+		headers = [ line for line in self.patch( result, 6 ).split( '\n' ) if line.startswith( '@@' ) ]
+		self.assertEqual( headers, [ '@@ -1,20 +1,19 @@' ] )
+
+	@unittest.skipIf( shutil.which( 'patch' ) is None, 'needs the patch program' )
+	def test_patches_apply_cleanly( self ):
+		folder = tempfile.mkdtemp()
+		self.addCleanup( shutil.rmtree, folder )
+		pathA = os.path.join( folder, 'a.txt' )
+		pathPatch = os.path.join( folder, 'a.patch' )
+		pathOut = os.path.join( folder, 'out.txt' )
+		for context in ( 0, 3 ):
+			for linesA, linesB in pairs():
+				with open( pathA, 'w', newline='\n' ) as f:
+					f.write( ''.join( line + '\n' for line in linesA ) )
+				if linesA == linesB:
+					continue
+				result = compare.compare_lines( linesA, linesB )
+				export.write_export( pathPatch, export.unified_diff( result.bufferA, result.bufferB, result.row_kinds(), 'a.txt', 'b.txt', context ) )
+
+				# no fuzz and no offset, every hunk has to apply where it says
+				done = subprocess.run( [ 'patch', '--fuzz=0', '--force', '-o', pathOut, pathA, '-i', pathPatch ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True )
+				self.assertEqual( done.returncode, 0, done.stdout )
+				self.assertNotIn( 'offset', done.stdout )
+				with open( pathOut, newline='\n' ) as f:
+					self.assertEqual( f.read(), ''.join( line + '\n' for line in linesB ) )
+
+
+class HtmlReportTests( unittest.TestCase ):
+	def report( self, linesA, linesB, context=None ):
+		result = compare.compare_lines( linesA, linesB )
+		pieces = export.html_report( result.bufferA, result.bufferB, result.row_kinds(), intra_rows( result.subHighlightA ), intra_rows( result.subHighlightB ), 'a <1>', 'b & 2', None, context )
+		return ''.join( pieces )
+
+	def test_rows_and_line_numbers( self ):
+		page = self.report( [ 'keep', 'gone', 'keep too' ], [ 'keep', 'keep too', 'new' ] )
+		self.assertTrue( page.startswith( '<!DOCTYPE html>' ) )
+		self.assertTrue( page.endswith( export.HTML_TAIL ) )
+		self.assertIn( '<td class="num">2</td><td class="removed">gone</td><td class="num"></td><td class="filler"></td>', page )
+		self.assertIn( '<td class="num"></td><td class="filler"></td><td class="num">3</td><td class="added">new</td>', page )
+		self.assertEqual( page.count( '<tr><td' ), 4 )
+
+	def test_text_is_escaped( self ):
+		page = self.report( [ 'if a < b && c > d:' ], [ 'if a < b and c > d:' ] )
+		self.assertIn( '<th colspan="2">a &lt;1&gt;</th><th colspan="2">b &amp; 2</th>', page )
+		self.assertNotIn( 'a < b', page )
+		self.assertIn( 'a &lt; b', page )
+
+	def test_intraline_spans( self ):
+		page = self.report( [ 'x = compute( 1 )' ], [ 'x = compute( 2 )' ] )
+		self.assertIn( '<span class="modified_deletion">1</span>', page )
+		self.assertIn( '<span class="modified_addition">2</span>', page )
+
+	def test_context_leaves_out_unchanged_rows( self ):
+		linesA = [ 'line %d' % n for n in range( 50 ) ]
+		linesB = list( linesA )
+		linesB[25] = 'changed'
+		page = self.report( linesA, linesB, 2 )
+		self.assertEqual( page.count( '<tr class="hunk">' ), 1 )
+		self.assertIn( '@@ line 24 / 24 @@', page )
+		self.assertNotIn( '>line 10<', page )
+		self.assertEqual( page.count( '<tr><td' ), 6 )
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,86 @@
+# tests for reading and checking files, run with plain python:
+#   python -m unittest discover tests
+#   python tests/test_fileio.py
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+
+from sbs_core import fileio
+
+
+class FileTestCase( unittest.TestCase ):
+	def setUp( self ):
+		self.folder = tempfile.mkdtemp()
+		self.addCleanup( shutil.rmtree, self.folder )
+
+	def write( self, name, data ):
+		path = os.path.join( self.folder, name )
+		with open( path, 'wb' ) as f:
+			f.write( data )
+		return path
+
+
+class SameContentsTests( FileTestCase ):
+	def test_same_and_different( self ):
+		pathA = self.write( 'a', b'one\ntwo\n' )
+		self.assertTrue( fileio.same_contents( pathA, self.write( 'b', b'one\ntwo\n' ) ) )
+		self.assertFalse( fileio.same_contents( pathA, self.write( 'c', b'one\ntwo\nthree\n' ) ) )
+		self.assertFalse( fileio.same_contents( pathA, self.write( 'd', b'one\nTWO\n' ) ) )
+
+	def test_empty_files( self ):
+		self.assertTrue( fileio.same_contents( self.write( 'a', b'' ), self.write( 'b', b'' ) ) )
+
+	def test_difference_after_the_first_chunk( self ):
+		# small chunks, so the files are compared over several reads
+		self.addCleanup( setattr, fileio, 'READ_CHUNK', fileio.READ_CHUNK )
+		fileio.READ_CHUNK = 16
+		data = bytes( range( 256 ) ) * 4
+		pathA = self.write( 'a', data )
+		self.assertTrue( fileio.same_contents( pathA, self.write( 'b', data ) ) )
+		self.assertFalse( fileio.same_contents( pathA, self.write( 'c', data[:-1] + b'!' ) ) )
+
+
+class IsBinaryTests( FileTestCase ):
+	def test_text_is_not_binary( self ):
+		self.assertFalse( fileio.is_binary( self.write( 'a', 'plain text, caf\xe9\n'.encode( 'utf-8' ) ) ) )
+		self.assertFalse( fileio.is_binary( self.write( 'b', b'' ) ) )
+
+	def test_nul_byte_is_binary( self ):
+		self.assertTrue( fileio.is_binary( self.write( 'a', b'PK\x03\x04\x00\x00data' ) ) )
+
+	def test_utf16_with_bom_is_text( self ):
+		self.assertFalse( fileio.is_binary( self.write( 'a', 'text'.encode( 'utf-16' ) ) ) )
+
+	def test_only_the_sample_is_looked_at( self ):
+		self.assertFalse( fileio.is_binary( self.write( 'a', b'x' * fileio.BINARY_SAMPLE + b'\x00' ) ) )
+
+
+class HexLinesTests( FileTestCase ):
+	def test_rows( self ):
+		lines = list( fileio.hex_lines( self.write( 'a', b'Hello, world!\n\x00\xffmore' ) ) )
+		self.assertEqual( lines, [
+			'00000000  48 65 6c 6c 6f 2c 20 77 6f 72 6c 64 21 0a 00 ff  |Hello, world!...|',
+			'00000010  6d 6f 72 65                                      |more|',
+		] )
+
+	def test_empty_file( self ):
+		self.assertEqual( list( fileio.hex_lines( self.write( 'a', b'' ) ) ), [] )
+
+	def test_offsets_carry_across_chunks( self ):
+		self.addCleanup( setattr, fileio, 'READ_CHUNK', fileio.READ_CHUNK )
+		fileio.READ_CHUNK = fileio.HEX_WIDTH * 2
+		data = bytes( range( 100 ) )
+		lines = list( fileio.hex_lines( self.write( 'a', data ) ) )
+		self.assertEqual( len( lines ), 7 )
+		self.assertEqual( [ line[:8] for line in lines ], [ '%08x' % offset for offset in range( 0, 100, 16 ) ] )
+		# the bytes read back out of the rows are the file
+		self.assertEqual( b''.join( bytes.fromhex( line[10:57] ) for line in lines ), data )
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,69 @@
+# tests for the intraline engine, run with plain python:
+#   python -m unittest discover tests
+#   python tests/test_intraline.py
+
+import os
+import sys
+import unittest
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+
+from sbs_core import compare
+from sbs_core import intraline
+
+
+def differ( **options ):
+	settings = compare.read_options()
+	settings.update( options )
+	return intraline.IntralineDiffer( settings )
+
+
+class IntralineTests( unittest.TestCase ):
+	def test_tokenize( self ):
+		self.assertEqual( intraline.tokenize( 'foo( a,  b )' ), ( [ 'foo', '(', ' ', 'a', ',', '  ', 'b', ' ', ')' ], [ 0, 3, 4, 5, 6, 7, 9, 10, 11, 12 ] ) )
+
+	def test_insert( self ):
+		# an empty span on A where B's tokens went in
+		self.assertEqual( differ().diff( 'foo(a)', 'foo(a, b)' ), [ ( 5, 5, 5, 8 ) ] )
+		self.assertEqual( differ().diff( 'foo(a, b)', 'foo(a)' ), [ ( 5, 8, 5, 5 ) ] )
+
+	def test_replace( self ):
+		# short replaced tokens are refined down to the characters that differ
+		self.assertEqual( differ().diff( 'x = compute( 1 )', 'x = compute( 2 )' ), [ ( 13, 14, 13, 14 ) ] )
+		self.assertEqual( differ().diff( 'call( first )', 'call( second )' ), [ ( 6, 9, 6, 6 ), ( 10, 11, 7, 12 ) ] )
+		# longer ones are highlighted whole
+		self.assertEqual( differ( intraline_refine_length=3 ).diff( 'call( first )', 'call( second )' ), [ ( 6, 11, 6, 12 ) ] )
+
+	def test_whitespace( self ):
+		# whitespace runs are tokens of their own
+		self.assertEqual( differ().diff( 'a  b', 'a b' ), [ ( 2, 3, 2, 2 ) ] )
+		# with intraline_emptyspace the empty side of an insert or delete is
+		# highlighted as wide as the other side
+		self.assertEqual( differ( intraline_emptyspace=True ).diff( 'foo(a)', 'foo(a, b)' ), [ ( 5, 8, 5, 8 ) ] )
+		self.assertEqual( differ( intraline_emptyspace=True ).diff( 'foo(a, b)', 'foo(a)' ), [ ( 5, 8, 5, 8 ) ] )
+
+	def test_char_granularity( self ):
+		self.assertEqual( differ( intraline_granularity='char' ).diff( 'value = 10', 'value = 12' ), [ ( 9, 10, 9, 10 ) ] )
+
+	def test_long_lines_are_left_whole( self ):
+		self.assertIsNone( differ( intraline_max_line_length=10 ).diff( 'x = compute( 1 )', 'x = compute( 2 )' ) )
+		self.assertIsNotNone( differ( intraline_max_line_length=0 ).diff( 'x = compute( 1 )', 'x = compute( 2 )' ) )
+
+		# the rows are still highlighted, only without spans
+		result = compare.compare_lines( [ 'x = compute( 1 )' ], [ 'x = compute( 2 )' ], { 'intraline_max_line_length': 10 } )
+		self.assertEqual( bytes( result.row_kinds() ), b'-+' )
+		self.assertEqual( len( result.subHighlightA ) + len( result.subHighlightB ), 0 )
+		self.assertEqual( result.line_regions( 'A' ), [ ( 0, 16 ) ] )
+
+	def test_lines_with_no_match( self ):
+		# lines with nothing in common aren't paired, so they get no spans
+		result = compare.compare_lines( [ 'keep', 'completely different', 'end' ], [ 'keep', 'nothing alike here at all', 'end' ] )
+		self.assertEqual( bytes( result.row_kinds() ), b' -+ ' )
+		self.assertEqual( len( result.subHighlightA ) + len( result.subHighlightB ), 0 )
+
+		# and a paired line with no token in common is one replace span
+		self.assertEqual( differ( intraline_refine_length=0 ).diff( 'abc', 'xyz' ), [ ( 0, 3, 0, 3 ) ] )
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,32 @@
+# tests for comparison stats, run with plain python:
+#   python -m unittest discover tests
+#   python tests/test_stats.py
+
+import os
+import sys
+import unittest
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+
+from sbs_core import compare
+from sbs_core import stats
+
+
+class StatsTests( unittest.TestCase ):
+	def test_result_sizes( self ):
+		# one line changed, one removed and two added:
+		#   keep       keep
+		#   value = 1
+		#              value = 2
+		#   gone
+		#   keep       keep
+		#              new
+		#              newer
+		result = compare.compare_lines( [ 'keep', 'value = 1', 'gone', 'keep' ], [ 'keep', 'value = 2', 'keep', 'new', 'newer' ] )
+		runStats = stats.CompareStats( 'test' )
+		runStats.count( **stats.result_sizes( result ) )
+		self.assertEqual( runStats.as_dict()['sizes'], { 'rows': 7, 'removed_rows': 2, 'added_rows': 3, 'changed_rows': 5 } )
+
+
+if __name__ == '__main__':
+	unittest.main()